@@ -1,18 +1,17 @@
 import os
-from flask import Flask, request
+from flask import Flask, request, json as flask_json
 from flask_session import Session
 from flask_cors import CORS
-from pymongo import MongoClient
 import dotenv
 from flask_jwt_extended import JWTManager
 import logging
 from datetime import timedelta
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from redis import Redis
 from flask_socketio import SocketIO
-import ibm_boto3
-from ibm_botocore.client import Config
+from .classes.http.json_provider import BSONJSONProvider
+from .classes.connections.connection_manager import ConnectionManager, LazyClient, LazyDatabase
+from .classes.connections.startup_tasks import StartupTasks
 
 current_dir = os.path.dirname(__file__)
 dotenv_path = os.path.join(current_dir, 'important_variables.env')
@@ -22,6 +21,7 @@ logging.basicConfig(level=logging.DEBUG)
 
 # Builds application and configures environmental variables.
 app = Flask(__name__)
+app.json = BSONJSONProvider(app)
 jwt = JWTManager(app)
 
 app.secret_key = os.getenv('FLASK_SECRET_KEY')
@@ -41,6 +41,13 @@ app.config['AUTH_URI'] = os.getenv('AUTH_URI')
 app.config['TOKEN_URI'] = os.getenv('TOKEN_URI')
 app.config['USER_INFO'] = os.getenv('USER_INFO')
 app.config['FOURSQUARE_API_KEY'] = os.getenv('FOURSQUARE_API_KEY')
+app.config['FOURSQUARE_API_URL'] = os.getenv('FOURSQUARE_API_URL', 'https://api.foursquare.com/v3/places/search')
+app.config['FOURSQUARE_CACHE_SIZE'] = int(os.getenv('FOURSQUARE_CACHE_SIZE', 1024))
+app.config['FOURSQUARE_CACHE_TTL'] = int(os.getenv('FOURSQUARE_CACHE_TTL', 3600))
+app.config['FOURSQUARE_CONNECT_TIMEOUT'] = float(os.getenv('FOURSQUARE_CONNECT_TIMEOUT', 1.0))
+app.config['FOURSQUARE_READ_TIMEOUT'] = float(os.getenv('FOURSQUARE_READ_TIMEOUT', 2.0))
+app.config['FOURSQUARE_BREAKER_THRESHOLD'] = int(os.getenv('FOURSQUARE_BREAKER_THRESHOLD', 5))
+app.config['FOURSQUARE_BREAKER_RESET'] = int(os.getenv('FOURSQUARE_BREAKER_RESET', 30))
 #change
 app.config['ATLAS_API_KEY'] = os.getenv('ATLAS_API_KEY')
 app.config['ATLAS_GROUP_ID'] = os.getenv('ATLAS_GROUP_ID')
@@ -54,6 +61,17 @@ app.config['IBM_ENDPOINT_URL'] = os.getenv('IBM_ENDPOINT_URL')
 
 #change
 app.config['MONGODB_URI'] = os.getenv('MONGODB_URI')
+app.config['MONGO_MAX_POOL_SIZE'] = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+app.config['MONGO_MIN_POOL_SIZE'] = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+app.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'] = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000))
+app.config['MONGO_CONNECT_TIMEOUT_MS'] = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'] = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))
+app.config['MONGO_SOCKET_TIMEOUT_MS'] = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 0))  # 0 waits indefinitely
+app.config['REDIS_URL'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+app.config['REDIS_MAX_CONNECTIONS'] = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+app.config['REDIS_POOL_TIMEOUT'] = float(os.getenv('REDIS_POOL_TIMEOUT', 5))
+app.config['REDIS_SOCKET_TIMEOUT'] = float(os.getenv('REDIS_SOCKET_TIMEOUT', 5))
+app.config['REDIS_CONNECT_TIMEOUT'] = float(os.getenv('REDIS_CONNECT_TIMEOUT', 2))
 
 app.config['ASSISTANT_ID'] = os.getenv('ASSISTANT_ID')
 app.config['SENDING_EMAIL'] = os.getenv('SENDING_EMAIL')
@@ -61,9 +79,29 @@ app.config['SENDING_EMAIL_PASSWORD'] = os.getenv('SENDING_EMAIL_PASSWORD')
 app.config['RECEIVING_EMAIL'] = os.getenv('RECEIVING_EMAIL')
 app.config['ELEVENLABS_API_KEY'] = os.getenv('ELEVENLABS_API_KEY')
 app.config['VOICE_ASSISTANT_PROMPT'] = os.getenv('VOICE_ASSISTANT_PROMPT')
+app.config['ID_LEASE_SIZE'] = int(os.getenv('ID_LEASE_SIZE', 1000))
+app.config['BULK_CHUNK_SIZE'] = int(os.getenv('BULK_CHUNK_SIZE', 1000))
+app.config['ENSURE_INDEXES_ON_STARTUP'] = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+app.config['AUTOCOMPLETE_LIMIT'] = int(os.getenv('AUTOCOMPLETE_LIMIT', 5))
+app.config['AUTOCOMPLETE_FALLBACK_BELOW'] = int(os.getenv('AUTOCOMPLETE_FALLBACK_BELOW', 3))
+app.config['AUTOCOMPLETE_FOURSQUARE_FALLBACK'] = os.getenv('AUTOCOMPLETE_FOURSQUARE_FALLBACK', 'true').lower() == 'true'
+app.config['BUILD_AUTOCOMPLETE_ON_STARTUP'] = os.getenv('BUILD_AUTOCOMPLETE_ON_STARTUP', 'true').lower() == 'true'
+app.config['BUILD_SEARCH_INDEX_ON_STARTUP'] = os.getenv('BUILD_SEARCH_INDEX_ON_STARTUP', 'true').lower() == 'true'
+app.config['BUILD_ANALYTICS_ON_STARTUP'] = os.getenv('BUILD_ANALYTICS_ON_STARTUP', 'true').lower() == 'true'
+app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+app.config['COMPRESSION_GZIP_LEVEL'] = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+app.config['COMPRESSION_CACHE_SIZE'] = int(os.getenv('COMPRESSION_CACHE_SIZE', 32 * 1024 * 1024))
+app.config['INVALIDATION_BUS_ENABLED'] = os.getenv('INVALIDATION_BUS_ENABLED', 'true').lower() == 'true'
+app.config['INVALIDATION_BUS_SOURCE'] = os.getenv('INVALIDATION_BUS_SOURCE', 'auto')  # auto, change_stream or pubsub
+app.config['CHANGE_LOG_RETENTION_DAYS'] = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', 30))
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv('SOCKETIO_MESSAGE_QUEUE')  # e.g. redis://host:6379/0, shared by all workers
+app.config['BUSINESS_PUSH_WINDOW_MS'] = int(os.getenv('BUSINESS_PUSH_WINDOW_MS', 250))
+app.config['ZIPCODE_CENTROIDS_PATH'] = os.getenv('ZIPCODE_CENTROIDS_PATH', os.path.join(os.path.dirname(current_dir), 'data', 'zipcode_centroids.npz'))
 
 Session(app)
-socketio = SocketIO(app, cors_allowed_origins="*") 
+# flask.json encodes Socket.IO payloads with the app's JSON provider, the same as HTTP responses
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'], json=flask_json)
 
 if not app.secret_key:
     raise ValueError("No secret key set for Flask application")
@@ -75,11 +113,15 @@ if not app.config['JWT_ACCESS_TOKEN_EXPIRES']:
 
 #This is the setup for mongoDb essentially
 CORS(app, resources={r"/*": {"origins": ["https://localhost:8080", "https://fbla-project-23e7b.web.app"]}}, supports_credentials=True)
-client = MongoClient(app.config['MONGODB_URI'])
-db = client.get_database('BusinessDB')
+# Clients are created on first use in each process. Nothing at import time uses them (the startup work that
+# needs MongoDB runs in startup_tasks, per process, after the fork), so a preforking master never connects.
+connection_manager = ConnectionManager(app.config)
+client = LazyClient(connection_manager.mongo)
+db = LazyDatabase(connection_manager, 'BusinessDB')
 rate_limiting = db.get_collection('rate_limiting')
 
-redis_client = Redis(host='localhost', port=6379, db=0)
+redis_client = LazyClient(connection_manager.redis)
+cos = LazyClient(connection_manager.cos)
 
 def exclude_options():
     if request.method == 'OPTIONS':
@@ -89,26 +131,10 @@ def exclude_options():
 limiter = Limiter(
     app=app,
     key_func=exclude_options,
-    storage_uri="redis://localhost:6379",
+    storage_uri=app.config['REDIS_URL'],
     default_limits_exempt_when=lambda: False
 )
 
-try:
-    cos = ibm_boto3.resource('s3',
-        ibm_api_key_id=app.config['IBM_API_KEY'],
-        ibm_service_instance_id=app.config['IBM_SERVICE_INSTANCE_ID'],
-        ibm_auth_endpoint=app.config['IBM_AUTH_URL'],
-        config=Config(signature_version='oauth'),
-        endpoint_url=app.config['IBM_ENDPOINT_URL']
-    )
-
-    # Perform a simple operation to check the connection, like listing buckets
-    buckets = list(cos.buckets.all())
-    logging.info("Successfully connected to IBM Cloud Object Storage. Buckets available: {}".format([bucket.name for bucket in buckets]))
-
-except Exception as e:
-    logging.error("Failed to connect to IBM Cloud Object Storage: {}".format(e))
-
 from app.routes import ai_socket_events, account_routes, login_routes, data_routes, pdf_routes, util_routes, ai_socket_events
 app.register_blueprint(account_routes.account_routes_bp)
 app.register_blueprint(login_routes.login_routes_bp)
@@ -118,4 +144,34 @@ app.register_blueprint(util_routes.util_routes_bp)
 app.register_blueprint(ai_socket_events.ai_routes_bp)
 
 from .routes.ai_socket_events import setup_socket_events
-setup_socket_events(socketio)
\ No newline at end of file
+setup_socket_events(socketio)
+
+from .routes.business_socket_events import setup_business_socket_events
+setup_business_socket_events(socketio)
+
+from .classes.http.response_compression import response_compressor
+response_compressor.init_app(app)
+
+startup_tasks = StartupTasks()
+
+if app.config['ENSURE_INDEXES_ON_STARTUP']:
+    from .classes.mongo.indexes import IndexRegistry
+    startup_tasks.register("ensure MongoDB indexes", IndexRegistry.ensure_indexes)
+
+if app.config['BUILD_AUTOCOMPLETE_ON_STARTUP']:
+    from .classes.business.autocomplete_index import autocomplete_index
+    startup_tasks.register("build autocomplete index", autocomplete_index.ensure_built)
+
+if app.config['BUILD_SEARCH_INDEX_ON_STARTUP']:
+    from .classes.business.search_index import search_index
+    startup_tasks.register("build search index", search_index.ensure_built)
+
+if app.config['BUILD_ANALYTICS_ON_STARTUP']:
+    from .classes.business.analytics_snapshot import analytics_snapshot
+    startup_tasks.register("build analytics snapshot", analytics_snapshot.ensure_built)
+
+startup_tasks.init_app(app)
+
+if app.config['INVALIDATION_BUS_ENABLED']:
+    from .classes.business.invalidation_bus import invalidation_bus
+    invalidation_bus.init_app(app)
@@ -0,0 +1,232 @@
+import math
+import logging
+import threading
+import numpy as np
+from app import db
+from .search_index import Column
+from .rebuildable_index import RebuildableIndex
+
+businesses_collection = db.businesses
+
+METRIC_FIELDS = ['yearly_revenue', 'employee_count', 'customer_satisfaction', 'website_traffic']
+GROUP_FIELDS = ['organization_type']
+DEFAULT_PERCENTILES = [25, 50, 75, 90, 99]
+MAX_HISTOGRAM_BINS = 200
+COMPACT_RATIO = 0.25
+COMPACT_MIN_DEAD = 1000
+SPARSE_FACTOR = 8
+
+def metric_value(value):
+    # Missing or non-numeric values become NaN and are left out of every statistic
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    return float(value)
+
+# Columnar in-memory copy of the admin metrics, one numpy array per field, so cohort statistics are
+# vectorized over the whole collection instead of aggregated in Mongo per request. organization_type is
+# dictionary-encoded into integer codes. Like SearchIndex, a changed business gets a new row and its old row
+# is tombstoned; tombstoned rows are masked out of every query and compacted away in bulk.
+#
+# Percentiles come from cached sort orders per metric (overall and per organization type) rather than from a
+# sort per request. Rows appended since the order was built are merged in with searchsorted, and tombstoned
+# rows simply fail the query mask, so the orders only need a full rebuild after a compaction.
+class AnalyticsSnapshot(RebuildableIndex):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.rows = {}  # business_id -> live row
+        self.business_ids = Column(np.int64)
+        self.metrics = {field: Column(np.float64) for field in METRIC_FIELDS}
+        self.organization_codes = Column(np.int32)
+        self.organization_types = []
+        self.organization_lookup = {}
+        self.alive = Column(np.bool_)
+        self.dead = 0
+        self.orders = {}  # metric -> (rows covered, {None or organization code: rows sorted by value})
+
+    def _scan(self):
+        fresh = AnalyticsSnapshot()
+        fresh._append(businesses_collection.find(
+            {"business_id": {"$type": "number"}},
+            {"_id": 0, "business_id": 1, "organization_type": 1, **{field: 1 for field in METRIC_FIELDS}}
+        ))
+        return fresh
+
+    def _adopt(self, fresh):
+        self.rows, self.business_ids, self.metrics = fresh.rows, fresh.business_ids, fresh.metrics
+        self.organization_codes, self.organization_types = fresh.organization_codes, fresh.organization_types
+        self.organization_lookup, self.alive, self.dead, self.orders = (
+            fresh.organization_lookup, fresh.alive, fresh.dead, fresh.orders)
+        logging.info(f"Analytics snapshot built with {self.alive.size} businesses")
+
+    # Applies business detail documents (see BusinessDetails) and deletions from the write paths.
+    def apply(self, details=(), deleted_ids=()):
+        businesses = {document['business_id']: document['admin']['business_info'] for document in details}
+        with self.lock:
+            self._track(details, deleted_ids)
+            for business_id in list(deleted_ids) + list(businesses):
+                row = self.rows.pop(business_id, None)
+                if row is not None:
+                    self.alive.data[row] = False
+                    self.dead += 1
+            self._append(businesses.values())
+            if self.dead >= COMPACT_MIN_DEAD and self.dead > COMPACT_RATIO * self.alive.size:
+                self._compact()
+
+    def _append(self, businesses):
+        business_ids, codes = [], []
+        metrics = {field: [] for field in METRIC_FIELDS}
+        for business in businesses:
+            business_id = business.get('business_id')
+            if not isinstance(business_id, int):
+                continue
+            self.rows[business_id] = self.alive.size + len(business_ids)
+            business_ids.append(business_id)
+            codes.append(self._organization_code(business.get('organization_type')))
+            for field in METRIC_FIELDS:
+                metrics[field].append(metric_value(business.get(field)))
+
+        if business_ids:
+            self.business_ids.extend(business_ids)
+            self.organization_codes.extend(codes)
+            for field in METRIC_FIELDS:
+                self.metrics[field].extend(metrics[field])
+            self.alive.extend(np.ones(len(business_ids), dtype=np.bool_))
+
+    def _organization_code(self, organization_type):
+        organization_type = organization_type if isinstance(organization_type, str) else None
+        code = self.organization_lookup.get(organization_type)
+        if code is None:
+            code = self.organization_lookup[organization_type] = len(self.organization_types)
+            self.organization_types.append(organization_type)
+        return code
+
+    def _compact(self):
+        alive = self.alive.view()
+        business_ids = self.business_ids.view()[alive]
+        self.business_ids = Column(np.int64, business_ids)
+        self.metrics = {field: Column(np.float64, column.view()[alive]) for field, column in self.metrics.items()}
+        self.organization_codes = Column(np.int32, self.organization_codes.view()[alive])
+        self.alive = Column(np.bool_, np.ones(len(business_ids), dtype=np.bool_))
+        self.rows = {int(business_id): row for row, business_id in enumerate(business_ids)}
+        self.dead = 0
+        self.orders = {}
+
+    # Returns {None: all rows, code: rows of that organization type}, each sorted by the metric with NaNs left
+    # out, bringing the cached orders up to date with any appended rows first.
+    def _sorted_rows(self, field):
+        values = self.metrics[field].view()
+        codes = self.organization_codes.view()
+        covered, orders = self.orders.get(field, (0, {}))
+        if covered == len(values):
+            return orders
+
+        new_rows = np.arange(covered, len(values))
+        new_rows = new_rows[~np.isnan(values[new_rows])]
+        new_rows = new_rows[np.argsort(values[new_rows], kind='stable')]
+        orders = dict(orders)
+        for key, rows in [(None, new_rows)] + [
+            (code, new_rows[codes[new_rows] == code]) for code in np.unique(codes[new_rows]).tolist()
+        ]:
+            existing = orders.get(key)
+            if existing is None or not len(existing):
+                orders[key] = rows
+            elif len(rows):
+                positions = np.searchsorted(values[existing], values[rows], side='right')
+                orders[key] = np.insert(existing, positions, rows)
+        self.orders[field] = (len(values), orders)
+        return orders
+
+    # Computes cohort statistics over the live rows.
+    #   organization_types - keep only these organization types
+    #   ranges             - {metric: (low, high)}, either bound may be None
+    #   group_by           - None or 'organization_type'
+    #   histogram          - optional (metric, bins) computed over the whole filtered cohort
+    def query(self, organization_types=None, ranges=None, group_by=None, metrics=None, percentiles=None,
+              histogram=None):
+        metrics = metrics or METRIC_FIELDS
+        percentiles = DEFAULT_PERCENTILES if percentiles is None else percentiles
+
+        with self.lock:
+            mask = self.alive.view().copy()
+            codes = self.organization_codes.view()
+            if organization_types is not None:
+                wanted = [self.organization_lookup[name] for name in organization_types if name in self.organization_lookup]
+                mask &= np.isin(codes, wanted)
+            for field, (low, high) in (ranges or {}).items():
+                values = self.metrics[field].view()
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+
+            group_counts = np.bincount(codes[mask], minlength=len(self.organization_types))
+            result = {"count": int(group_counts.sum()), "metrics": {}}
+            groups = [code for code in range(len(self.organization_types)) if group_counts[code]] \
+                if group_by == 'organization_type' else []
+            group_metrics = {code: {} for code in groups}
+
+            # A selective filter is cheaper to sort directly than to pick out of the cached full-length orders
+            sparse = result["count"] * SPARSE_FACTOR < mask.size
+            rows = np.flatnonzero(mask) if sparse else None
+            for field in metrics:
+                values = self.metrics[field].view()
+                if sparse:
+                    row_codes = codes[rows]
+                    result["metrics"][field] = AnalyticsSnapshot.describe(np.sort(values[rows]), percentiles)
+                    for code in groups:
+                        group_metrics[code][field] = AnalyticsSnapshot.describe(
+                            np.sort(values[rows[row_codes == code]]), percentiles)
+                    continue
+
+                orders = self._sorted_rows(field)
+                result["metrics"][field] = AnalyticsSnapshot.describe(
+                    values[orders[None][mask[orders[None]]]], percentiles)
+                for code in groups:
+                    group_rows = orders.get(code, np.zeros(0, dtype=np.int64))
+                    group_metrics[code][field] = AnalyticsSnapshot.describe(
+                        values[group_rows[mask[group_rows]]], percentiles)
+
+            if groups:
+                result["groups"] = [
+                    {"organization_type": self.organization_types[code], "count": int(group_counts[code]),
+                     "metrics": group_metrics[code]}
+                    for code in groups
+                ]
+
+            if histogram is not None:
+                field, bins = histogram
+                values = self.metrics[field].view()[mask]
+                values = values[~np.isnan(values)]
+                counts, edges = np.histogram(values, bins=bins) if len(values) else (np.zeros(0), np.zeros(0))
+                result["histogram"] = {"metric": field, "counts": counts.astype(int).tolist(), "edges": edges.tolist()}
+
+            return result
+
+    # Summary of one metric over a cohort, given its values in ascending order (NaNs sort last and are dropped).
+    @staticmethod
+    def describe(selected, percentiles):
+        count = len(selected) - int(np.isnan(selected).sum())
+        selected = selected[:count]
+        if not count:
+            return {"count": 0}
+
+        # Linear interpolation between the closest ranks, the same as numpy.percentile's default
+        positions = np.asarray(percentiles, dtype=np.float64) / 100 * (count - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+        points = selected[lower] + (selected[upper] - selected[lower]) * (positions - lower)
+        total = float(selected.sum())
+        return {
+            "count": int(count),
+            "sum": total,
+            "mean": total / count,
+            "min": float(selected[0]),
+            "max": float(selected[-1]),
+            "percentiles": {f"{p:g}": float(v) for p, v in zip(percentiles, points)}
+        }
+
+analytics_snapshot = AnalyticsSnapshot()
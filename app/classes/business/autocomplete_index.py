@@ -0,0 +1,175 @@
+import re
+import logging
+import threading
+from bisect import bisect_left
+from app import db
+from .rebuildable_index import RebuildableIndex
+
+businesses_collection = db.businesses
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Name matches outrank matches on organization type or resources
+FIELD_WEIGHTS = {'business_name': 3.0, 'organization_type': 1.0, 'resources_available': 1.0}
+MAX_PREFIX_TERMS = 256
+MIN_FUZZY_LENGTH = 4
+FUZZY_PENALTY = 0.5
+
+def tokenize(value):
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(str(item) for item in value)
+    return TOKEN_PATTERN.findall(str(value).lower()) if value is not None else []
+
+def deletions(term):
+    return {term[:position] + term[position + 1:] for position in range(len(term))}
+
+# Whether two terms are within one insertion, deletion, substitution or adjacent transposition
+def within_one_edit(a, b):
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        differences = [position for position in range(len(a)) if a[position] != b[position]]
+        if len(differences) <= 1:
+            return True
+        first, second = differences[0], differences[-1]
+        return len(differences) == 2 and second == first + 1 and a[first] == b[second] and a[second] == b[first]
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    return any(longer[:position] + longer[position + 1:] == shorter for position in range(len(longer)))
+
+# In-process autocomplete over business_name, organization_type and resources_available. Terms are kept in
+# a sorted list for prefix lookups, and a one-deletion neighbourhood of every term (as in SymSpell) gives
+# typo-tolerant matches without scanning the vocabulary.
+class AutocompleteIndex(RebuildableIndex):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.RLock()
+        self.names = {}           # business_id -> business_name
+        self.business_terms = {}  # business_id -> {term: weight}
+        self.postings = {}        # term -> {business_id: weight}
+        self.sorted_terms = []
+        self.deletes = {}         # one-deletion variant -> {terms}
+
+    # Loads every business from MongoDB; see RebuildableIndex for how it replaces the index.
+    def _scan(self):
+        fresh = AutocompleteIndex()
+        for business in businesses_collection.find(
+            {"business_id": {"$ne": None}},
+            {"_id": 0, "business_id": 1, "business_name": 1, "organization_type": 1, "resources_available": 1}
+        ):
+            fresh._add(business)
+        fresh.sorted_terms.sort()
+        return fresh
+
+    def _adopt(self, fresh):
+        self.names, self.business_terms, self.postings = fresh.names, fresh.business_terms, fresh.postings
+        self.sorted_terms, self.deletes = fresh.sorted_terms, fresh.deletes
+        logging.info(f"Autocomplete index built with {len(self.names)} businesses and {len(self.postings)} terms")
+
+    # Applies business detail documents (see BusinessDetails) and deletions from the write paths.
+    def apply(self, details=(), deleted_ids=()):
+        with self.lock:
+            self._track(details, deleted_ids)
+            for business_id in deleted_ids:
+                self._remove(business_id)
+            for document in details:
+                self._remove(document['business_id'])
+                self._add(document['admin']['business_info'], keep_sorted=True)
+
+    def search(self, query, limit=5, fuzzy=True):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self.lock:
+            scores = self._match(tokens, fuzzy=False)
+            if fuzzy and len(scores) < limit:
+                for business_id, score in self._match(tokens, fuzzy=True).items():
+                    scores.setdefault(business_id, score)
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.names[item[0]]), item[0]))[:limit]
+            return [{"business_id": business_id, "name": self.names[business_id]} for business_id, _ in ranked]
+
+    # Every query token has to match; the last one may still be a partial word.
+    def _match(self, tokens, fuzzy):
+        scores = None
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            token_scores = {}
+            for term, penalty in self._candidate_terms(token, is_last, fuzzy):
+                for business_id, weight in self.postings[term].items():
+                    score = weight * penalty * (1.0 if term == token else 0.8)
+                    if score > token_scores.get(business_id, 0):
+                        token_scores[business_id] = score
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {business_id: score + token_scores[business_id]
+                          for business_id, score in scores.items() if business_id in token_scores}
+            if not scores:
+                return {}
+        return scores
+
+    def _candidate_terms(self, token, is_prefix, fuzzy):
+        if not fuzzy:
+            if not is_prefix:
+                return [(token, 1.0)] if token in self.postings else []
+            start = bisect_left(self.sorted_terms, token)
+            candidates = []
+            for term in self.sorted_terms[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(token):
+                    break
+                candidates.append((term, 1.0))
+            return candidates
+
+        if len(token) < MIN_FUZZY_LENGTH:
+            return []
+        terms = set(self.deletes.get(token, ()))
+        for variant in deletions(token):
+            if variant in self.postings:
+                terms.add(variant)
+            terms.update(self.deletes.get(variant, ()))
+        return [(term, FUZZY_PENALTY) for term in terms if term != token and within_one_edit(term, token)]
+
+    def _add(self, business, keep_sorted=False):
+        business_id = business.get('business_id')
+        if business_id is None:
+            return
+        self.names[business_id] = business.get('business_name') or ''
+
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(business.get(field)):
+                weights[term] = max(weights.get(term, 0), weight)
+        self.business_terms[business_id] = weights
+
+        for term, weight in weights.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                if keep_sorted:
+                    self.sorted_terms.insert(bisect_left(self.sorted_terms, term), term)
+                else:
+                    self.sorted_terms.append(term)
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for variant in deletions(term):
+                        self.deletes.setdefault(variant, set()).add(term)
+            self.postings[term][business_id] = weight
+
+    def _remove(self, business_id):
+        self.names.pop(business_id, None)
+        for term in self.business_terms.pop(business_id, {}):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(business_id, None)
+            if not postings:
+                del self.postings[term]
+                del self.sorted_terms[bisect_left(self.sorted_terms, term)]
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for variant in deletions(term):
+                        variants = self.deletes.get(variant)
+                        if variants is not None:
+                            variants.discard(term)
+                            if not variants:
+                                del self.deletes[variant]
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,141 @@
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app import db
+from .business_views import BusinessViews
+from ..geo.zipcode_centroids import zipcode_centroids
+from .rollups import BusinessRollups, ROLLUP_FIELDS
+from .validation import BUSINESS_SCHEMA, ADDRESS_SCHEMA, business_update_validator, address_partial_validator
+
+businesses_collection = db.businesses
+addresses_collection = db.addresses
+linker_collection = db.linker
+
+EDITABLE_BUSINESS_FIELDS = [field for field in BUSINESS_SCHEMA if field != 'address']
+ADDRESS_FIELD_MAPPING = {
+    'line1': 'address_line_1',
+    'line2': 'address_line_2',
+    'city': 'city',
+    'state': 'state',
+    'zipcode': 'zipcode',
+    'country': 'country'
+}
+
+# Applies many business or address edits with one read and one unordered bulk_write per collection. The
+# current values are read first so each item can report whether it matched and whether it changed
+# anything; items that wouldn't change anything are not sent to MongoDB at all.
+class BulkEditor:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def edit_businesses(edits):
+        changed = []
+        results = BulkEditor.apply(
+            businesses_collection, 'business_id', edits, EDITABLE_BUSINESS_FIELDS, {}, business_update_validator,
+            read_fields=ROLLUP_FIELDS, changed=changed
+        )
+        if changed:
+            BusinessRollups.record(before=[before for before, _ in changed], after=[after for _, after in changed])
+        modified_ids = [result['business_id'] for result in results if result.get('modified')]
+        if modified_ids:
+            BusinessViews.sync(changed_ids=list(dict.fromkeys(modified_ids)))
+        return results
+
+    @staticmethod
+    def edit_addresses(edits):
+        results = BulkEditor.apply(
+            addresses_collection, 'address_id', edits, list(ADDRESS_SCHEMA), ADDRESS_FIELD_MAPPING, address_partial_validator
+        )
+        modified_ids = [result['address_id'] for result in results if result.get('modified')]
+        moved_ids = [result['address_id'] for result in results
+                     if result.get('modified') and 'zipcode' in edits[result['index']]['changes']]
+        if moved_ids:
+            zipcode_centroids.relocate(moved_ids)
+        if modified_ids:
+            business_ids = linker_collection.distinct('business_id', {'address_id': {'$in': modified_ids}})
+            BusinessViews.sync(changed_ids=business_ids, list_changed=False)
+        return results
+
+    # If a `changed` list is given, (before, after) pairs of every modified document are appended to it,
+    # with at least `read_fields` in each.
+    @staticmethod
+    def apply(collection, id_field, edits, editable_fields, field_mapping, validator, read_fields=(), changed=None):
+        results = []
+        pending = []
+        for index, edit in enumerate(edits):
+            errors = BulkEditor.check_edit(edit, id_field, editable_fields, validator)
+            if errors:
+                results.append({'index': index, id_field: edit.get(id_field) if isinstance(edit, dict) else None,
+                                'matched': False, 'modified': False, 'errors': errors})
+                continue
+            changes = {field_mapping.get(field, field): value for field, value in edit['changes'].items()}
+            pending.append((index, edit[id_field], changes))
+
+        # One read for the current values of every field being changed
+        changed_fields = {field for _, _, changes in pending for field in changes}
+        projection = {'_id': 0, id_field: 1}
+        projection.update({field: 1 for field in changed_fields | set(read_fields)})
+        current = {
+            document[id_field]: document
+            for document in collection.find({id_field: {'$in': [entity_id for _, entity_id, _ in pending]}}, projection)
+        }
+        originals = {entity_id: dict(document) for entity_id, document in current.items()}
+
+        updates = {}  # entity_id -> (merged $set, results of the edits it holds)
+        for index, entity_id, changes in pending:
+            document = current.get(entity_id)
+            result = {'index': index, id_field: entity_id, 'matched': document is not None, 'modified': False}
+            if document is not None:
+                effective = {field: value for field, value in changes.items() if document.get(field) != value}
+                if effective:
+                    # Later edits to the same document in this batch see the earlier ones
+                    document.update(effective)
+                    update, update_results = updates.setdefault(entity_id, ({}, []))
+                    update.update(effective)
+                    update_results.append(result)
+                    result['modified'] = True
+            results.append(result)
+
+        # One update per document: an unordered bulk_write doesn't apply operations in any particular order,
+        # so several updates to the same document could land with an earlier edit winning
+        entity_ids = list(updates)
+        operations = [UpdateOne({id_field: entity_id}, {'$set': updates[entity_id][0]}) for entity_id in entity_ids]
+        failed_ids = set()
+        if operations:
+            try:
+                collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details['writeErrors']:
+                    entity_id = entity_ids[error['index']]
+                    for result in updates[entity_id][1]:
+                        result['modified'] = False
+                        result['errors'] = [error.get('errmsg', 'Write failed')]
+                    failed_ids.add(entity_id)
+
+        if changed is not None:
+            modified_ids = set(updates)
+            # Where a document's update failed, its stored state is read back
+            if failed_ids:
+                current.update({
+                    document[id_field]: document
+                    for document in collection.find({id_field: {'$in': list(failed_ids)}}, projection)
+                })
+            changed.extend((originals[entity_id], current[entity_id])
+                           for entity_id in modified_ids if entity_id in current)
+
+        results.sort(key=lambda result: result['index'])
+        return results
+
+    @staticmethod
+    def check_edit(edit, id_field, editable_fields, validator):
+        if not isinstance(edit, dict):
+            return ['Edit must be an object']
+        if not isinstance(edit.get(id_field), int) or isinstance(edit.get(id_field), bool):
+            return [f'{id_field} must be an integer']
+        changes = edit.get('changes')
+        if not isinstance(changes, dict) or not changes:
+            return ['changes must be a non-empty object']
+        unknown_fields = [field for field in changes if field not in editable_fields]
+        if unknown_fields:
+            return [f'Field cannot be edited: {field}' for field in unknown_fields]
+        return validator.validate(changes)
@@ -0,0 +1,123 @@
+import csv
+import io
+import zlib
+from flask import current_app
+from app import db
+from .business_details import ADMIN_INFO_FIELDS
+
+businesses_collection = db.businesses
+addresses_collection = db.addresses
+linker_collection = db.linker
+
+# Same address column names the importer reads, so an export can be re-imported as is
+ADDRESS_EXPORT_FIELDS = [('address_id', 'address_id'), ('line1', 'address_line_1'), ('line2', 'address_line_2'),
+                         ('city', 'city'), ('state', 'state'), ('zipcode', 'zipcode'), ('country', 'country')]
+CSV_COLUMNS = ADMIN_INFO_FIELDS + [column for column, _ in ADDRESS_EXPORT_FIELDS]
+EXPORT_BATCH_SIZE = 500
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+# Streams every business joined with its addresses. The businesses and linker cursors are both sorted on
+# business_id and merged in step; addresses are fetched with one $in per batch of businesses. Memory use
+# is bounded by the batch size no matter how large the collections are.
+class BulkExporter:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def export(export_format='csv', compress=False, compression_level=6):
+        rows = BulkExporter.csv_chunks() if export_format == 'csv' else BulkExporter.ndjson_chunks()
+        if not compress:
+            for chunk in rows:
+                yield chunk.encode('utf-8')
+            return
+
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in rows:
+            compressed = compressor.compress(chunk.encode('utf-8'))
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    # Yields (business, [addresses]) batches in business_id order.
+    @staticmethod
+    def joined_batches():
+        # Legacy documents without an integer business_id can't be joined and are left out
+        businesses = businesses_collection.find({"business_id": {"$type": "number"}}, {"_id": 0}) \
+            .sort("business_id", 1).batch_size(EXPORT_BATCH_SIZE)
+        links = linker_collection.find({"business_id": {"$type": "number"}}, {"_id": 0}) \
+            .sort([("business_id", 1), ("address_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+        link = next(links, None)
+
+        batch = []
+        for business in businesses:
+            address_ids = []
+            # Links are consumed in lockstep; links to businesses that no longer exist are skipped
+            while link is not None and link['business_id'] < business['business_id']:
+                link = next(links, None)
+            while link is not None and link['business_id'] == business['business_id']:
+                address_ids.append(link['address_id'])
+                link = next(links, None)
+
+            batch.append((business, address_ids))
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield BulkExporter.attach_addresses(batch)
+                batch = []
+        if batch:
+            yield BulkExporter.attach_addresses(batch)
+
+    @staticmethod
+    def attach_addresses(batch):
+        address_ids = [address_id for _, ids in batch for address_id in ids]
+        addresses_by_id = {
+            address['address_id']: address
+            for address in addresses_collection.find({"address_id": {"$in": address_ids}}, {"_id": 0})
+        } if address_ids else {}
+        return [
+            (business, [addresses_by_id[address_id] for address_id in ids if address_id in addresses_by_id])
+            for business, ids in batch
+        ]
+
+    # One CSV row per business/address pair; businesses without an address get a single row.
+    @staticmethod
+    def csv_chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+
+        for batch in BulkExporter.joined_batches():
+            for business, addresses in batch:
+                business_values = [business.get(field, '') for field in ADMIN_INFO_FIELDS]
+                for address in addresses or [{}]:
+                    writer.writerow(business_values + [address.get(field, '') for _, field in ADDRESS_EXPORT_FIELDS])
+
+                if buffer.tell() >= OUTPUT_CHUNK_SIZE:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+
+        yield buffer.getvalue()
+
+    # One JSON line per business with its addresses nested.
+    @staticmethod
+    def ndjson_chunks():
+        dumps = current_app.json.dumps
+        lines = []
+        size = 0
+
+        for batch in BulkExporter.joined_batches():
+            for business, addresses in batch:
+                document = {field: business[field] for field in ADMIN_INFO_FIELDS if field in business}
+                document['addresses'] = [
+                    {column: address.get(field, '') for column, field in ADDRESS_EXPORT_FIELDS}
+                    for address in addresses
+                ]
+                line = dumps(document) + '\n'
+                lines.append(line)
+                size += len(line)
+
+                if size >= OUTPUT_CHUNK_SIZE:
+                    yield ''.join(lines)
+                    lines = []
+                    size = 0
+
+        yield ''.join(lines)
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+
+ADDRESS_COLUMNS = ['line1', 'line2', 'city', 'state', 'zipcode', 'country']
+INTEGER_COLUMNS = ['yearly_revenue', 'employee_count', 'website_traffic']
+FLOAT_COLUMNS = ['customer_satisfaction']
+BOOLEAN_COLUMNS = ['has_available_resources']
+TRUE_VALUES = ('true', 'yes', '1')
+FALSE_VALUES = ('false', 'no', '0')
+
+# Incremental parsers for business uploads. Both read the upload one line at a time and yield business data
+# dicts in the shape add_business takes, so an import never holds more than one chunk of rows in memory.
+# A row that can't be decoded is yielded as the ValueError describing it and reported as invalid.
+class BulkImporter:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def text_stream(binary_stream):
+        return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+    # NDJSON rows use the same nested shape as the /add_business body.
+    @staticmethod
+    def parse_ndjson(binary_stream):
+        for line_number, line in enumerate(BulkImporter.text_stream(binary_stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ValueError(f"Malformed JSON on line {line_number}: {e}")
+
+    # CSV rows are flat: business columns plus line1, line2, city, state, zipcode and country (optionally
+    # prefixed with "address."). Numeric and boolean columns are converted before validation.
+    @staticmethod
+    def parse_csv(binary_stream):
+        reader = csv.DictReader(BulkImporter.text_stream(binary_stream))
+        for row in reader:
+            if None in row:
+                yield ValueError(f"Too many columns on line {reader.line_num}")
+                continue
+            yield BulkImporter.csv_row_to_business(row)
+
+    @staticmethod
+    def csv_row_to_business(row):
+        business_data = {}
+        address = {}
+        for column, value in row.items():
+            column = column.strip()
+            value = (value or '').strip()
+            address_column = column[len('address.'):] if column.startswith('address.') else column
+            if address_column in ADDRESS_COLUMNS:
+                address[address_column] = value
+            else:
+                business_data[column] = BulkImporter.convert_value(column, value)
+        business_data['address'] = address
+        return business_data
+
+    # Values that don't convert are left as strings so validation can report the type error.
+    @staticmethod
+    def convert_value(column, value):
+        try:
+            if column in INTEGER_COLUMNS:
+                return int(value)
+            if column in FLOAT_COLUMNS:
+                return float(value)
+        except ValueError:
+            return value
+        if column in BOOLEAN_COLUMNS:
+            if value.lower() in TRUE_VALUES:
+                return True
+            if value.lower() in FALSE_VALUES:
+                return False
+        return value
@@ -0,0 +1,203 @@
+from itertools import islice
+from flask import current_app
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from app import app, db
+from ...models.business import Business
+from ...models.address import Address
+from ...models.linker import Linker
+from ..mongo.transactions import Transactions
+from .business_details import BusinessDetails
+from .business_views import BusinessViews
+from .rollups import BusinessRollups
+from ..geo.zipcode_centroids import zipcode_centroids
+from .id_allocator import business_id_allocator, address_id_allocator
+from .validation import business_validator
+
+businesses_collection = db.businesses
+addresses_collection = db.addresses
+linker_collection = db.linker
+
+# Bulk ingestion engine behind add_multiple_businesses and /add_businesses. Rows are validated a chunk at a
+# time, given integer IDs from one lease per chunk and written with unordered bulk_write, so a failed row
+# doesn't stop the rest of its chunk. Each row gets an entry in the returned report.
+class BulkIngestor:
+    def __init__(self):
+        pass
+
+    # on_chunk(report) is called after every chunk. max_row_results caps how many row entries are kept, and
+    # errors_only keeps just the invalid/failed rows, which bounds the report for very large imports.
+    @staticmethod
+    def ingest(rows, chunk_size=None, transactional=False, on_chunk=None, errors_only=False, max_row_results=None):
+        chunk_size = chunk_size or app.config['BULK_CHUNK_SIZE']
+        report = {"processed": 0, "inserted": 0, "invalid": 0, "failed": 0, "rows": []}
+
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            for row_result in BulkIngestor.ingest_chunk(chunk, report["processed"], transactional):
+                report[row_result["status"]] += 1
+                if errors_only and row_result["status"] == "inserted":
+                    continue
+                if max_row_results is None or len(report["rows"]) < max_row_results:
+                    report["rows"].append(row_result)
+            report["processed"] += len(chunk)
+            if on_chunk:
+                on_chunk(report)
+
+        return report
+
+    @staticmethod
+    def ingest_chunk(chunk, start_index, transactional):
+        results = []
+        rows = []
+        for offset, business_data in enumerate(chunk):
+            # Parsers hand over rows they couldn't decode as the exception describing why
+            if isinstance(business_data, Exception):
+                results.append({"row": start_index + offset, "status": "invalid", "errors": [str(business_data)]})
+            elif not isinstance(business_data, dict):
+                results.append({"row": start_index + offset, "status": "invalid", "errors": ["Row must be an object"]})
+            else:
+                rows.append((start_index + offset, business_data))
+
+        valid_rows = []
+        for (row_index, business_data), errors in zip(rows, business_validator.validate_many(data for _, data in rows)):
+            if errors:
+                results.append({"row": row_index, "status": "invalid", "errors": errors})
+            else:
+                valid_rows.append((row_index, business_data))
+
+        if not valid_rows:
+            return results
+
+        business_ids = business_id_allocator.allocate(len(valid_rows))
+        address_ids = address_id_allocator.allocate(len(valid_rows))
+        business_docs, address_docs, linker_docs = BulkIngestor.build_documents(valid_rows, business_ids, address_ids)
+
+        try:
+            if transactional:
+                failed = Transactions.run(
+                    lambda session: BulkIngestor.write_chunk(business_docs, address_docs, linker_docs, session)
+                )
+            else:
+                failed = BulkIngestor.write_chunk(business_docs, address_docs, linker_docs)
+        except PyMongoError as e:
+            # A failed transaction leaves nothing behind, so every row of the chunk is reported as failed
+            current_app.logger.error(f"Bulk ingestion chunk starting at row {start_index} failed: {e}")
+            failed = {position: str(e) for position in range(len(valid_rows))}
+
+        details = []
+        for position, (row_index, _) in enumerate(valid_rows):
+            if position in failed:
+                results.append({"row": row_index, "status": "failed", "errors": [failed[position]]})
+            else:
+                results.append({
+                    "row": row_index,
+                    "status": "inserted",
+                    "business_id": business_ids[position],
+                    "address_id": address_ids[position]
+                })
+                details.append(BusinessDetails.build(business_docs[position], [address_docs[position]]))
+
+        if details:
+            BusinessViews.sync(details=details)
+
+        results.sort(key=lambda row_result: row_result["row"])
+        return results
+
+    @staticmethod
+    def build_documents(valid_rows, business_ids, address_ids):
+        business_docs, address_docs, linker_docs = [], [], []
+        for (_, business_data), business_id, address_id in zip(valid_rows, business_ids, address_ids):
+            new_business = Business(
+                business_name=business_data['business_name'],
+                organization_type=business_data['organization_type'],
+                resources_available=business_data['resources_available'],
+                has_available_resources=business_data['has_available_resources'],
+                contact_info=business_data['contact_info'],
+                yearly_revenue=business_data['yearly_revenue'],
+                employee_count=business_data['employee_count'],
+                customer_satisfaction=business_data['customer_satisfaction'],
+                website_traffic=business_data['website_traffic']
+            )
+            new_business.business_id = business_id
+            business_docs.append(new_business.to_dict())
+
+            address = Address()
+            address.add_address(
+                address_id=address_id,
+                address_line_1=business_data['address']['line1'],
+                address_line_2=business_data['address'].get('line2', ''),
+                city=business_data['address']['city'],
+                state=business_data['address']['state'],
+                zipcode=business_data['address']['zipcode'],
+                country=business_data['address']['country']
+            )
+            address_docs.append(zipcode_centroids.attach(address.to_dict()))
+
+            linker = Linker()
+            linker.add_link(business_id, address_id)
+            linker_docs.append(linker.to_dict())
+        return business_docs, address_docs, linker_docs
+
+    # Writes businesses first, then the addresses and links of the businesses that made it in.
+    # Returns {position in chunk: error message} for the rows that failed. Outside a transaction, a business
+    # whose address or link didn't make it in is removed again, along with its rollup counts.
+    @staticmethod
+    def write_chunk(business_docs, address_docs, linker_docs, session=None):
+        failed = BulkIngestor.bulk_insert(businesses_collection, business_docs, range(len(business_docs)), session)
+
+        written = [position for position in range(len(business_docs)) if position not in failed]
+        BusinessRollups.record(after=[business_docs[position] for position in written], session=session)
+        try:
+            failed.update(BulkIngestor.bulk_insert(addresses_collection, address_docs, written, session))
+
+            linked = [position for position in written if position not in failed]
+            failed.update(BulkIngestor.bulk_insert(linker_collection, linker_docs, linked, session))
+        except PyMongoError:
+            # Which dependent rows landed is unknown, so everything this chunk wrote goes
+            if session is None:
+                BulkIngestor.remove_orphans(business_docs, address_docs, linker_docs, written, failed)
+            raise
+
+        if session is None:
+            orphans = [position for position in written if position in failed]
+            BulkIngestor.remove_orphans(business_docs, address_docs, linker_docs, orphans, failed)
+        return failed
+
+    # Deletes the businesses, addresses and links at the given positions and takes the businesses back out of
+    # the rollups. If that fails too, the IDs left behind are added to those rows' errors.
+    @staticmethod
+    def remove_orphans(business_docs, address_docs, linker_docs, positions, failed):
+        if not positions:
+            return
+        business_ids = [business_docs[position]['business_id'] for position in positions]
+        address_ids = [address_docs[position]['address_id'] for position in positions]
+        try:
+            linker_collection.delete_many({"business_id": {"$in": business_ids}})
+            addresses_collection.delete_many({"address_id": {"$in": address_ids}})
+            businesses_collection.delete_many({"business_id": {"$in": business_ids}})
+            BusinessRollups.record(before=[business_docs[position] for position in positions])
+        except PyMongoError as e:
+            current_app.logger.error(f"Failed to remove partially inserted businesses {business_ids}: {e}")
+            for position in positions:
+                if position in failed:
+                    failed[position] += (f"; business {business_docs[position]['business_id']} and address "
+                                         f"{address_docs[position]['address_id']} may have been partially inserted")
+
+    @staticmethod
+    def bulk_insert(collection, documents, positions, session):
+        positions = list(positions)
+        if not positions:
+            return {}
+        try:
+            collection.bulk_write([InsertOne(documents[position]) for position in positions],
+                                  ordered=False, session=session)
+        except BulkWriteError as e:
+            # Inside a transaction the whole chunk has to be rolled back
+            if session is not None:
+                raise
+            return {positions[error['index']]: error.get('errmsg', 'Write failed') for error in e.details['writeErrors']}
+        return {}
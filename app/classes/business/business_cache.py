@@ -0,0 +1,46 @@
+from flask import current_app
+from redis.exceptions import RedisError
+from app import redis_client
+
+LIST_VERSION_KEY = "businesses:list:version"
+LIST_BODY_KEY = "businesses:list:body:{version}"
+LIST_BODY_TTL = 86400  # Bodies for superseded versions simply age out
+
+class BusinessCache:
+    def __init__(self):
+        pass
+
+    # Returns the list version (None if Redis is unavailable) and the version's cached JSON bytes of the
+    # business list, building them with the loader on a miss. The body key is tied to the current version,
+    # so a bumped version makes every worker rebuild once.
+    @staticmethod
+    def get_list(loader):
+        try:
+            version = BusinessCache.list_version()
+            body = redis_client.get(LIST_BODY_KEY.format(version=version))
+        except RedisError as e:
+            current_app.logger.warning(f"Business list cache unavailable, reading from MongoDB: {e}")
+            return None, current_app.json.dumps(loader()).encode('utf-8')
+
+        if body is not None:
+            return version, body
+
+        body = current_app.json.dumps(loader()).encode('utf-8')
+        try:
+            redis_client.set(LIST_BODY_KEY.format(version=version), body, ex=LIST_BODY_TTL)
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to store business list in cache: {e}")
+        return version, body
+
+    @staticmethod
+    def list_version():
+        return int(redis_client.get(LIST_VERSION_KEY) or 0)
+
+    # Called after every successful write to the businesses collection.
+    @staticmethod
+    def bump_version():
+        try:
+            return redis_client.incr(LIST_VERSION_KEY)
+        except RedisError as e:
+            current_app.logger.error(f"Failed to bump business list cache version: {e}")
+            return None
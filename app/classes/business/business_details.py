@@ -0,0 +1,140 @@
+from datetime import datetime
+from flask import current_app
+from pymongo import ReplaceOne
+from app import db
+
+businesses_collection = db.businesses
+addresses_collection = db.addresses
+linker_collection = db.linker
+business_details_collection = db.business_details
+
+PUBLIC_INFO_FIELDS = ['business_id', 'business_name', 'organization_type', 'resources_available',
+                      'has_available_resources', 'contact_info']
+ADMIN_INFO_FIELDS = PUBLIC_INFO_FIELDS + ['yearly_revenue', 'employee_count', 'customer_satisfaction',
+                                          'website_traffic']
+
+# Denormalized read model behind /api/business_info. Each document is keyed by business_id and holds the
+# exact public and admin responses, so a detail view is one indexed find_one instead of a $lookup pipeline.
+class BusinessDetails:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def build(business, addresses):
+        return dict({
+            "_id": business['business_id'],
+            "business_id": business['business_id'],
+            "business_name": business.get('business_name'),
+            "synced_at": datetime.utcnow()
+        }, **BusinessDetails.views(business, addresses))
+
+    # The public and admin responses for a business. Also used directly for legacy businesses without a
+    # business_id, which have no read model document.
+    @staticmethod
+    def views(business, addresses):
+        addresses = sorted(addresses, key=lambda address: address.get('address_id') or 0)
+        return {
+            "public": {
+                "business_info": {field: business[field] for field in PUBLIC_INFO_FIELDS if field in business},
+                "addresses": addresses
+            },
+            "admin": {
+                "business_info": {field: business[field] for field in ADMIN_INFO_FIELDS if field in business},
+                "addresses": addresses
+            }
+        }
+
+    # Returns the ready-to-serve detail response for a business name, or None if it isn't materialized. With a
+    # business_id only that business is considered; otherwise the lowest business_id with the name wins.
+    @staticmethod
+    def load(business_name, is_admin, business_id=None):
+        variant = 'admin' if is_admin else 'public'
+        query = {"business_name": business_name}
+        if business_id is not None:
+            query["_id"] = business_id
+        document = business_details_collection.find_one(query, {"_id": 0, variant: 1}, sort=[("_id", 1)])
+        return document[variant] if document else None
+
+    # Returns the business_info of each given business that is materialized, keyed by business_id.
+    @staticmethod
+    def load_many(business_ids, is_admin=False):
+        variant = 'admin' if is_admin else 'public'
+        return {
+            document['_id']: document[variant]['business_info']
+            for document in business_details_collection.find(
+                {"_id": {"$in": list(business_ids)}}, {f"{variant}.business_info": 1})
+        }
+
+    # Rebuilds the documents for the given businesses from the source collections with three batched reads.
+    @staticmethod
+    def refresh(business_ids):
+        business_ids = list(business_ids)
+        if not business_ids:
+            return []
+
+        businesses = list(businesses_collection.find({"business_id": {"$in": business_ids}}, {"_id": 0}))
+        documents = BusinessDetails.build_many(businesses)
+        BusinessDetails.save(documents)
+
+        missing_ids = set(business_ids) - {document['business_id'] for document in documents}
+        if missing_ids:
+            BusinessDetails.remove(missing_ids)
+        return documents
+
+    @staticmethod
+    def build_many(businesses):
+        business_ids = [business['business_id'] for business in businesses]
+        links = list(linker_collection.find({"business_id": {"$in": business_ids}}, {"_id": 0}))
+        address_ids = [link['address_id'] for link in links]
+        addresses_by_id = {
+            address['address_id']: address
+            for address in addresses_collection.find({"address_id": {"$in": address_ids}})
+        }
+
+        addresses_by_business = {}
+        for link in links:
+            address = addresses_by_id.get(link['address_id'])
+            if address is not None:
+                addresses_by_business.setdefault(link['business_id'], []).append(address)
+
+        return [
+            BusinessDetails.build(business, addresses_by_business.get(business['business_id'], []))
+            for business in businesses
+        ]
+
+    @staticmethod
+    def save(documents):
+        if documents:
+            business_details_collection.bulk_write(
+                [ReplaceOne({"_id": document['_id']}, document, upsert=True) for document in documents],
+                ordered=False
+            )
+
+    @staticmethod
+    def remove(business_ids):
+        business_ids = list(business_ids)
+        if business_ids:
+            business_details_collection.delete_many({"_id": {"$in": business_ids}})
+
+    # Backfills the read model from businesses/linker/addresses and drops documents for businesses that no
+    # longer exist. Used by `python scripts/manage.py rebuild-business-details`.
+    @staticmethod
+    def rebuild(batch_size=1000):
+        started_at = datetime.utcnow()
+
+        batch = []
+        total = 0
+        cursor = businesses_collection.find({"business_id": {"$ne": None}}, {"_id": 0}).sort("business_id", 1)
+        for business in cursor.batch_size(batch_size):
+            batch.append(business)
+            if len(batch) >= batch_size:
+                BusinessDetails.save(BusinessDetails.build_many(batch))
+                total += len(batch)
+                batch = []
+        if batch:
+            BusinessDetails.save(BusinessDetails.build_many(batch))
+            total += len(batch)
+
+        stale = business_details_collection.delete_many({"synced_at": {"$lt": started_at}})
+        current_app.logger.info(f"Rebuilt {total} business detail documents, removed {stale.deleted_count} stale ones")
+        return total
@@ -0,0 +1,81 @@
+import secrets
+from flask import current_app
+from redis.exceptions import RedisError
+from app import redis_client
+
+EPOCH_KEY = "businesses:etag:epoch"
+BUSINESS_VERSION_KEY = "business:version:{business_id}"
+NAME_INDEX_KEY = "businesses:name_index"  # business_name -> business_id
+
+# Strong ETags for the business list and detail responses, built only from versions kept in Redis so a
+# conditional GET can be answered without reading MongoDB. The list ETag uses BusinessCache's list version;
+# every business has its own version, bumped by BusinessViews.sync on each write that touches it. All of
+# them carry a random epoch that is regenerated if Redis loses its data, so versions that restart from zero
+# can never match an ETag handed out before.
+class BusinessETags:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def epoch():
+        epoch = redis_client.get(EPOCH_KEY)
+        if epoch is None:
+            redis_client.set(EPOCH_KEY, secrets.token_hex(4), nx=True)
+            epoch = redis_client.get(EPOCH_KEY)
+        return epoch.decode('utf-8')
+
+    @staticmethod
+    def list_etag(version):
+        try:
+            return f"{BusinessETags.epoch()}-list-{version}"
+        except RedisError as e:
+            current_app.logger.warning(f"Business ETags unavailable: {e}")
+            return None
+
+    # The business_id the name index holds for a name, i.e. the business last synced under it, or None when
+    # the name isn't known yet (or Redis is down). Names aren't unique, so detail responses are served for
+    # this business, which is the one their ETag describes.
+    @staticmethod
+    def business_id_for(business_name):
+        try:
+            business_id = redis_client.hget(NAME_INDEX_KEY, business_name) if business_name else None
+            return int(business_id) if business_id is not None else None
+        except RedisError as e:
+            current_app.logger.warning(f"Business ETags unavailable: {e}")
+            return None
+
+    # Returns the ETag for a business's detail response, or None when Redis is down, in which case the
+    # response goes out without one.
+    @staticmethod
+    def detail_etag(business_id, variant):
+        try:
+            version = int(redis_client.get(BUSINESS_VERSION_KEY.format(business_id=business_id)) or 0)
+            return f"{BusinessETags.epoch()}-{business_id}-{version}-{variant}"
+        except RedisError as e:
+            current_app.logger.warning(f"Business ETags unavailable: {e}")
+            return None
+
+    @staticmethod
+    def remember_names(names):
+        names = {name: business_id for name, business_id in names.items() if name}
+        if not names:
+            return
+        try:
+            redis_client.hset(NAME_INDEX_KEY, mapping=names)
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to update the business name index: {e}")
+
+    # Called from BusinessViews.sync for every business a write touched, including deleted ones, so their
+    # old ETags stop matching. Renamed or deleted names keep pointing at their old business_id until a request
+    # finds that business no longer has the name and looks the name up in MongoDB instead.
+    @staticmethod
+    def bump(business_ids):
+        if not business_ids:
+            return
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for business_id in business_ids:
+                pipeline.incr(BUSINESS_VERSION_KEY.format(business_id=business_id))
+            pipeline.execute()
+        except RedisError as e:
+            current_app.logger.error(f"Failed to bump business versions for {list(business_ids)}: {e}")
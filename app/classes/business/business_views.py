@@ -0,0 +1,54 @@
+from flask import current_app
+from .business_cache import BusinessCache
+from .business_details import BusinessDetails
+from .business_etags import BusinessETags
+from .autocomplete_index import autocomplete_index
+from .search_index import search_index
+from .analytics_snapshot import analytics_snapshot
+from .invalidation_bus import invalidation_bus
+from .change_log import BusinessChangeLog
+from .change_publisher import change_publisher
+
+class BusinessViews:
+    def __init__(self):
+        pass
+
+    # Keeps the list cache, the ETag versions, the business_details read model, the change log and the
+    # in-process autocomplete, search and analytics indexes in step with a write, then tells the other workers
+    # about it over the invalidation bus and pushes it to Socket.IO subscribers. Callers that already hold the
+    # new detail documents (the bulk paths) pass them in to skip re-reading the source collections. The
+    # primary write has already succeeded at this point, so a failure here is logged and left for the rebuild
+    # command to repair.
+    @staticmethod
+    def sync(changed_ids=(), deleted_ids=(), list_changed=True, details=None):
+        if list_changed:
+            BusinessCache.bump_version()
+
+        documents, missing_ids = [], set()
+        try:
+            if deleted_ids:
+                BusinessDetails.remove(deleted_ids)
+            if details is not None:
+                BusinessDetails.save(details)
+                documents = details
+            elif changed_ids:
+                documents = BusinessDetails.refresh(changed_ids)
+                # refresh() leaves out businesses that no longer exist, so those are dropped from the index too
+                missing_ids = set(changed_ids) - {document['business_id'] for document in documents}
+        except Exception as e:
+            current_app.logger.error(f"Failed to sync business details for {list(changed_ids) + list(deleted_ids)}: {e}")
+
+        # Versions move only once the detail documents are written, so a new ETag never labels an old body
+        BusinessETags.bump(set(changed_ids) | set(deleted_ids) | {document['business_id'] for document in documents})
+        BusinessETags.remember_names({document['business_name']: document['business_id'] for document in documents})
+        removed_ids = list(deleted_ids) + list(missing_ids)
+        try:
+            BusinessChangeLog.record(documents, removed_ids)
+        except Exception as e:
+            current_app.logger.error(f"Failed to record business changes for {list(changed_ids) + list(deleted_ids)}: {e}")
+        autocomplete_index.apply(documents, removed_ids)
+        search_index.apply(documents, removed_ids)
+        analytics_snapshot.apply(documents, removed_ids)
+        invalidation_bus.publish(documents, removed_ids)
+        change_publisher.publish(documents, removed_ids, list_changed)
+        return documents
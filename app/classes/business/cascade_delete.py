@@ -0,0 +1,69 @@
+from flask import current_app
+from pymongo.errors import PyMongoError
+from app import db
+from ..mongo.transactions import Transactions
+from .business_views import BusinessViews
+from .rollups import BusinessRollups, ROLLUP_FIELDS
+
+businesses_collection = db.businesses
+addresses_collection = db.addresses
+linker_collection = db.linker
+
+DELETE_CHUNK_SIZE = 1000
+
+# Deletes businesses together with their addresses and links. Address IDs come straight from the indexed
+# linker collection, and each chunk of businesses is removed in a single transaction.
+class CascadeDelete:
+    def __init__(self):
+        pass
+
+    # Returns the business IDs that were deleted and how many addresses went with them. Chunks that went
+    # through are synced even when a later one fails; a failure stops the delete and its message is returned
+    # under "error", with the IDs of that chunk and the ones after it under "failed_ids".
+    @staticmethod
+    def delete(business_ids):
+        business_ids = list(dict.fromkeys(business_ids))
+        result = {"deleted_ids": [], "deleted_addresses": 0}
+
+        failed_chunk = []
+        try:
+            for start in range(0, len(business_ids), DELETE_CHUNK_SIZE):
+                chunk = business_ids[start:start + DELETE_CHUNK_SIZE]
+                try:
+                    deleted_ids, deleted_addresses = Transactions.run(
+                        lambda session: CascadeDelete.delete_chunk(chunk, session)
+                    )
+                except PyMongoError as e:
+                    current_app.logger.error(f"Cascade delete of businesses {chunk[0]}..{chunk[-1]} failed: {e}")
+                    failed_chunk = chunk
+                    result["error"] = str(e)
+                    result["failed_ids"] = business_ids[start:]
+                    break
+                result["deleted_ids"].extend(deleted_ids)
+                result["deleted_addresses"] += deleted_addresses
+        finally:
+            # Without a transaction the failed chunk may be partly deleted, so its businesses are re-read:
+            # the ones that are gone are dropped from the views and the rest are left as they are
+            if result["deleted_ids"] or failed_chunk:
+                BusinessViews.sync(changed_ids=failed_chunk, deleted_ids=result["deleted_ids"])
+        return result
+
+    @staticmethod
+    def delete_chunk(business_ids, session=None):
+        # The rollup fields are read along with the IDs so the deleted businesses can be taken out of the rollups
+        existing = list(businesses_collection.find(
+            {"business_id": {"$in": business_ids}}, {"_id": 0, **{field: 1 for field in ROLLUP_FIELDS}}, session=session
+        ))
+        existing_ids = [business['business_id'] for business in existing]
+        if not existing_ids:
+            return [], 0
+
+        address_ids = linker_collection.distinct("address_id", {"business_id": {"$in": existing_ids}}, session=session)
+
+        deleted_addresses = 0
+        if address_ids:
+            deleted_addresses = addresses_collection.delete_many({"address_id": {"$in": address_ids}}, session=session).deleted_count
+        businesses_collection.delete_many({"business_id": {"$in": existing_ids}}, session=session)
+        linker_collection.delete_many({"business_id": {"$in": existing_ids}}, session=session)
+        BusinessRollups.record(before=existing, session=session)
+        return existing_ids, deleted_addresses
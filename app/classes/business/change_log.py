@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from app import db
+
+counters_collection = db.counters
+changes_collection = db.business_changes
+
+SEQ_COUNTER = 'business_changes'
+FLOOR_COUNTER = 'business_changes_floor'
+# A change only moves a client's cursor once it is this old, so writes that took a sequence number earlier
+# but landed later are never skipped
+SETTLE_SECONDS = 2
+DUPLICATE_KEY = 11000
+
+def list_entry(document):
+    return {"business_id": document['business_id'], "business_name": document.get('business_name')}
+
+# Change log behind /api/businesses/changes. Every write recorded by BusinessViews.sync takes a sequence
+# number from the counters collection, and the business_changes collection keeps only the latest change per
+# business: an upsert with the business as it appears in /api/businesses, or a delete tombstone. The log is
+# therefore compacted by construction and bounded by the number of businesses, plus tombstones, which
+# compact() drops once they are older than the retention period. Clients whose cursor is older than the
+# newest dropped tombstone (the floor) are told to reload the full list.
+class BusinessChangeLog:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def record(documents=(), deleted_ids=()):
+        changes = [(document['business_id'], "upsert", list_entry(document)) for document in documents]
+        changes += [(business_id, "delete", None) for business_id in deleted_ids]
+        if not changes:
+            return
+
+        last_seq = counters_collection.find_one_and_update(
+            {'_id': SEQ_COUNTER}, {'$inc': {'seq': len(changes)}}, upsert=True, return_document=ReturnDocument.AFTER
+        )['seq']
+        operations = [
+            # A writer that took an earlier number but got here later must not replace a newer change
+            UpdateOne(
+                {"_id": business_id, "seq": {"$lt": seq}},
+                {"$set": {"business_id": business_id, "seq": seq, "op": op, "business": business},
+                 "$currentDate": {"changed_at": True}},
+                upsert=True
+            )
+            for seq, (business_id, op, business) in enumerate(changes, start=last_seq - len(changes) + 1)
+        ]
+        try:
+            changes_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(error['code'] != DUPLICATE_KEY for error in e.details['writeErrors']):
+                raise
+
+    @staticmethod
+    def counter(name):
+        counter = counters_collection.find_one({'_id': name})
+        return counter['seq'] if counter else 0
+
+    # Changes after `since`, oldest first. `next` is the cursor for the following request; changes that
+    # haven't settled yet are returned but not passed, so they come again next time. Without a usable cursor
+    # (none, older than the floor, or ahead of the log) the client has to reload /api/businesses and continue
+    # from the returned `next`.
+    @staticmethod
+    def changes(since, limit):
+        head = BusinessChangeLog.counter(SEQ_COUNTER)
+        if since <= 0 or since < BusinessChangeLog.counter(FLOOR_COUNTER) or since > head:
+            return {"full_resync": True, "changes": [], "next": head, "has_more": False}
+
+        changes = list(changes_collection.find({"seq": {"$gt": since}}, {"_id": 0}).sort("seq", 1).limit(limit + 1))
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        settled_before = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+        next_since = since
+        for change in changes:
+            if change['changed_at'] > settled_before:
+                has_more = False
+                break
+            next_since = change['seq']
+
+        return {
+            "full_resync": False,
+            "changes": [{field: change[field] for field in ('seq', 'business_id', 'op', 'business')} for change in changes],
+            "next": next_since,
+            "has_more": has_more
+        }
+
+    # Drops tombstones older than the retention period and raises the floor past them. Returns how many
+    # were dropped.
+    @staticmethod
+    def compact(retention):
+        newest = changes_collection.find_one(
+            {"op": "delete", "changed_at": {"$lt": datetime.utcnow() - retention}}, {"seq": 1}, sort=[("seq", -1)]
+        )
+        if newest is None:
+            return 0
+        # The floor moves first, so a client can't pass it while the tombstones are being dropped
+        counters_collection.update_one({'_id': FLOOR_COUNTER}, {'$max': {'seq': newest['seq']}}, upsert=True)
+        return changes_collection.delete_many({"op": "delete", "seq": {"$lte": newest['seq']}}).deleted_count
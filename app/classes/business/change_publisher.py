@@ -0,0 +1,71 @@
+import os
+import threading
+from flask import current_app
+from app import app, socketio
+
+BUSINESS_NAMESPACE = '/businesses'
+LIST_ROOM = 'list'
+# Largest number of list entries sent in one 'businesses-changed' message
+LIST_CHUNK_SIZE = 1000
+
+def business_room(business_id):
+    return f"business:{business_id}"
+
+# Pushes business changes to Socket.IO clients on the /businesses namespace. The 'list' room receives
+# 'businesses-changed' with the list entries that were added, renamed or deleted, and each business:{id}
+# room receives 'business-changed' with that business's public detail view. Only public data is pushed.
+# Writes are collected per business for a short window before anything is sent, so a burst (a bulk import,
+# a bulk edit) becomes a few messages holding the latest state of each business instead of one per write.
+# With SOCKETIO_MESSAGE_QUEUE set, emits from any worker reach clients connected to the others.
+class BusinessChangePublisher:
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.pid = None
+        self.pending = {}  # business_id -> (op, public detail view or None, whether the list changed)
+        self.scheduled = False
+
+    # Called by BusinessViews.sync with the new detail documents and the removed business ids.
+    def publish(self, documents=(), deleted_ids=(), list_changed=True):
+        with self.lock:
+            # A forked worker starts without the flush task it inherited
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.pending, self.scheduled = {}, False
+            for document in documents:
+                previous = self.pending.get(document['business_id'])
+                self.pending[document['business_id']] = (
+                    "upsert", document['public'], list_changed or (previous is not None and previous[2]))
+            for business_id in deleted_ids:
+                self.pending[business_id] = ("delete", None, True)
+            if not self.pending or self.scheduled:
+                return
+            self.scheduled = True
+        socketio.start_background_task(self.flush_later)
+
+    def flush_later(self):
+        socketio.sleep(self.window)
+        with self.lock:
+            pending, self.pending, self.scheduled = self.pending, {}, False
+        # Inside the app context messages are encoded with the app's JSON provider, which handles ObjectIds
+        with app.app_context():
+            try:
+                self.emit(pending)
+            except Exception as e:
+                current_app.logger.error(f"Failed to push changes for {len(pending)} businesses: {e}")
+
+    def emit(self, pending):
+        upserts = [{"business_id": business_id, "business_name": view['business_info'].get('business_name')}
+                   for business_id, (op, view, list_changed) in pending.items() if op == "upsert" and list_changed]
+        deletes = [business_id for business_id, (op, _, _) in pending.items() if op == "delete"]
+        for start in range(0, max(len(upserts), len(deletes)), LIST_CHUNK_SIZE):
+            socketio.emit('businesses-changed', {
+                "upserts": upserts[start:start + LIST_CHUNK_SIZE],
+                "deletes": deletes[start:start + LIST_CHUNK_SIZE]
+            }, to=LIST_ROOM, namespace=BUSINESS_NAMESPACE)
+
+        for business_id, (op, view, _) in pending.items():
+            socketio.emit('business-changed', {"business_id": business_id, "op": op, "business": view},
+                          to=business_room(business_id), namespace=BUSINESS_NAMESPACE)
+
+change_publisher = BusinessChangePublisher(app.config['BUSINESS_PUSH_WINDOW_MS'] / 1000)
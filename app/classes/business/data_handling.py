@@ -1,13 +1,32 @@
-from flask import jsonify, current_app
-import requests
+from flask import jsonify, current_app, stream_with_context
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+from redis.exceptions import RedisError
 from app import db, cos
-import re
 import json
 from io import BytesIO
 from ...models.business import Business
 from ...routes.util_routes import is_user_admin
 from ...models.address import Address
 from ...models.linker import Linker
+from .business_cache import BusinessCache
+from .business_details import BusinessDetails
+from .business_views import BusinessViews
+from .business_etags import BusinessETags
+from ..http.response_compression import etag_matches
+from .autocomplete_index import autocomplete_index
+from .foursquare_proxy import foursquare_proxy
+from .search_index import search_index
+from .analytics_snapshot import analytics_snapshot, METRIC_FIELDS, GROUP_FIELDS, MAX_HISTOGRAM_BINS
+from .bulk_ingest import BulkIngestor
+from .cascade_delete import CascadeDelete
+from .bulk_edit import BulkEditor, EDITABLE_BUSINESS_FIELDS
+from .id_allocator import business_id_allocator, address_id_allocator
+from ..mongo.transactions import Transactions
+from ..geo.zipcode_centroids import zipcode_centroids
+from .change_log import BusinessChangeLog
+from .rollups import BusinessRollups, ROLLUP_FIELDS, DIMENSIONS as ROLLUP_DIMENSIONS
+from .validation import business_validator, business_update_validator, address_validator, address_update_validator
 from app import app
 
 businesses_collection = db.businesses
@@ -17,120 +36,162 @@ google_accounts_collection = db.google_accounts
 addresses_collection = db.addresses
 linker_collection = db.linker
 
-fbla_bucket = cos.Bucket('fbla-bucket')
+BACKUP_BUCKET = 'fbla-bucket'
 
-FOURSQUARE_API_KEY = app.config['FOURSQUARE_API_KEY']
+# Fields anyone may read from the business list; admin metrics stay behind get_business_info.
+PUBLIC_BUSINESS_FIELDS = ['business_id', 'business_name', 'organization_type', 'resources_available',
+                          'has_available_resources', 'contact_info']
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+MAX_IMPORT_ERRORS = 1000
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_NEARBY_RESULTS = 100
+MAX_CHANGES_PAGE_SIZE = 5000
+# Addresses fetched per requested business, since a business with several addresses shows up more than once
+NEARBY_ADDRESS_FANOUT = 4
 
 class DataHandler:
     def __init__(self):
         pass
 
-    def get_businesses():
-        businesses = businesses_collection.find({}, {'_id': 0, 'business_id': 1, 'business_name': 1})
-        business_list = list(businesses)
+    # if_none_match is the request's If-None-Match header; when it holds the current ETag the answer is a 304
+    # built from Redis alone.
+    def get_businesses(if_none_match=None):
+        def load_businesses():
+            businesses = businesses_collection.find({}, {'_id': 0, 'business_id': 1, 'business_name': 1})
+            return list(businesses)
+
+        if if_none_match:
+            try:
+                etag = BusinessETags.list_etag(BusinessCache.list_version())
+            except RedisError:
+                etag = None
+            if etag_matches(if_none_match, etag):
+                return DataHandler.not_modified(etag, 'no-cache')
+
+        version, body = BusinessCache.get_list(load_businesses)
+        response = current_app.response_class(body, mimetype='application/json')
+        etag = BusinessETags.list_etag(version) if version is not None else None
+        if etag:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
 
-        return jsonify(business_list)
-
-    def get_business_info(business_name, is_admin):
-        business_info_fields = {
-            "business_id": "$business_id",
-            "business_name": "$business_name",
-            "organization_type": "$organization_type",
-            "resources_available": "$resources_available",
-            "has_available_resources": "$has_available_resources",
-            "contact_info": "$contact_info"
-        }
-
-        if is_admin:
-            business_info_fields.update({
-                "yearly_revenue": "$yearly_revenue",
-                "employee_count": "$employee_count",
-                "customer_satisfaction": "$customer_satisfaction",
-                "website_traffic": "$website_traffic"
-            })
-
-        # MongoDB query to get all the addresses under one business
-        pipeline = [
-            {"$match": {"business_name": business_name}},
-            {"$lookup": {
-                "from": linker_collection.name,
-                "localField": "business_id",
-                "foreignField": "business_id",
-                "as": "linker_info"
-            }},
-            {"$unwind": {
-                "path": "$linker_info",
-                "preserveNullAndEmptyArrays": True
-            }},
-            {"$lookup": {
-                "from": addresses_collection.name,
-                "localField": "linker_info.address_id",
-                "foreignField": "address_id",
-                "as": "address_info"
-            }},
-            {"$unwind": {
-                "path": "$address_info",
-                "preserveNullAndEmptyArrays": True
-            }},
-            {"$project": {
-                "business_info": business_info_fields,
-                "address_info": "$address_info",
-                "_id": 0
-            }}
-        ]
-
-        result = list(businesses_collection.aggregate(pipeline))
-
-        if not result:
-            return jsonify({'error': 'Business not found'}), 404
-
-        # Converts ObjectId to string in the address information
-        for doc in result:
-            if 'address_info' in doc and '_id' in doc['address_info']:
-                doc['address_info']['_id'] = str(doc['address_info']['_id'])
-
-        output = {
-            "business_info": result[0]['business_info'] if result[0].get('business_info') else {},
-            "addresses": [doc['address_info'] for doc in result if 'address_info' in doc]
-        }
-
-        return jsonify(output)
+    @staticmethod
+    def not_modified(etag, cache_control):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    # Keyset-paginated, projected and/or NDJSON view of the business list. Documents are written out
+    # as the cursor yields them, so memory stays flat regardless of how many businesses there are.
+    # business_ids come from per-worker leases (see IdAllocator) and aren't in insertion order, so a page
+    # walk can miss businesses inserted while it runs; clients keeping a copy of the list catch those up
+    # with /api/businesses/changes.
+    def stream_businesses(after=None, limit=None, fields=None, output_format='json'):
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({'error': 'format must be json or ndjson'}), 400
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+        fields = fields or ['business_id', 'business_name']
+        unknown_fields = [field for field in fields if field not in PUBLIC_BUSINESS_FIELDS]
+        if unknown_fields:
+            return jsonify({'error': f'Unknown or restricted fields: {", ".join(unknown_fields)}'}), 400
+
+        projection = {'_id': 0, 'business_id': 1}
+        projection.update({field: 1 for field in fields})
+
+        # Legacy documents without an integer business_id have no place in the keyset order and are left out
+        query = {'business_id': {'$type': 'number'}}
+        if after is not None:
+            query['business_id']['$gt'] = after
+        cursor = businesses_collection.find(query, projection).sort('business_id', 1).batch_size(STREAM_BATCH_SIZE)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+
+        dumps = current_app.json.dumps
+
+        def generate_ndjson():
+            for business in cursor:
+                yield dumps({field: business.get(field) for field in fields}) + '\n'
+
+        # The cursor for the next page is only known once the last document has been written.
+        def generate_json():
+            last_id = None
+            count = 0
+            yield '{"businesses": ['
+            for business in cursor:
+                yield (',' if count else '') + dumps({field: business.get(field) for field in fields})
+                last_id = business['business_id']
+                count += 1
+            next_after = last_id if limit is not None and count == limit else None
+            yield '], "next_after": ' + dumps(next_after) + '}'
+
+        if output_format == 'ndjson':
+            return current_app.response_class(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+        return current_app.response_class(stream_with_context(generate_json()), mimetype='application/json')
+
+    # The ETag is read before the document, so a write landing in between can only make the response newer
+    # than its ETag, never older.
+    def get_business_info(business_name, is_admin, if_none_match=None):
+        variant = 'admin' if is_admin else 'public'
+        business_id = BusinessETags.business_id_for(business_name)
+        etag = BusinessETags.detail_etag(business_id, variant) if business_id is not None else None
+        if etag_matches(if_none_match, etag):
+            return DataHandler.not_modified(etag, 'private, no-cache')
+
+        # Business names aren't unique, so the body has to come from the business the ETag was built from
+        details = BusinessDetails.load(business_name, is_admin, business_id) if business_id is not None else None
+        if details is None:
+            # Renamed, deleted or not synced yet: whatever business now has the name goes out without an ETag
+            etag = None
+            details = BusinessDetails.load(business_name, is_admin)
+
+        if details is None:
+            # Businesses written before the read model existed are materialized on first view; legacy ones
+            # without a business_id can't be linked to addresses and are answered straight from the document
+            business = businesses_collection.find_one({"business_name": business_name}, {"_id": 0})
+            if not business:
+                return jsonify({'error': 'Business not found'}), 404
+            if business.get('business_id') is None:
+                details = BusinessDetails.views(business, [])[variant]
+            else:
+                documents = BusinessDetails.refresh([business['business_id']])
+                # Deleted since the find_one
+                if not documents:
+                    return jsonify({'error': 'Business not found'}), 404
+                details = documents[0][variant]
+
+        response = jsonify(details)
+        if etag:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+        elif details.get('business_info', {}).get('business_id') is not None:
+            # Known from now on; the next request gets an ETag
+            BusinessETags.remember_names({business_name: details['business_info']['business_id']})
+        return response
     
     def delete_business_by_id(business_id):
         # Deletes business and all addresses along with it
-        pipeline = [
-            {"$match": {"business_id": business_id}},
-            {"$lookup": {
-                "from": "linker",
-                "localField": "business_id",
-                "foreignField": "business_id",
-                "as": "linked_addresses"
-            }},
-            {"$unwind": "$linked_addresses"},
-            {"$lookup": {
-                "from": "addresses",
-                "localField": "linked_addresses.address_id",
-                "foreignField": "address_id",
-                "as": "address_details"
-            }},
-            {"$unwind": "$address_details"},
-            {"$project": {"address_id": "$address_details.address_id"}}
-        ]
-
-        linked_address_ids = [
-            doc['address_id'] for doc in businesses_collection.aggregate(pipeline)
-        ]
-
-        if linked_address_ids:
-            addresses_collection.delete_many({"address_id": {"$in": linked_address_ids}})
-
-        business_delete_result = businesses_collection.delete_one({"business_id": business_id})
-        if business_delete_result.deleted_count == 0:
+        result = CascadeDelete.delete([business_id])
+        if not result['deleted_ids']:
             return jsonify({"error": "Business not found or already deleted"}), 404
 
-        linker_collection.delete_many({"business_id": business_id})
-
         return jsonify({"message": "Business and all associated addresses deleted successfully"}), 200
+
+    # Bulk version of delete_business_by_id for admin purges
+    def delete_businesses(business_ids):
+        result = CascadeDelete.delete(business_ids)
+        deleted_ids = set(result['deleted_ids'])
+        accounted_ids = deleted_ids | set(result.get('failed_ids', []))
+        result['not_found_ids'] = [business_id for business_id in dict.fromkeys(business_ids) if business_id not in accounted_ids]
+        result['message'] = f"Deleted {len(deleted_ids)} businesses and {result['deleted_addresses']} addresses"
+        if 'error' in result:
+            result['message'] += f"; {len(result['failed_ids'])} businesses were not deleted"
+            return jsonify(result), 500
+        return jsonify(result), 200
     
     def add_business(business_data):
         current_app.logger.info(f"received data in refactored add_business method: {business_data}")
@@ -148,99 +209,205 @@ class DataHandler:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
-    # Batch additions for multiple businesses via forming multiple business documents, each containing one business to add.
-    def add_multiple_businesses(businesses_data):
-        valid_businesses = []
-        addresses = []
-        business_docs = []
-        linker_docs = []
-
-        for business_data in businesses_data:
-            validation_status, status_code = DataHandler.validate_data(business_data)
-            if status_code == 200:
-                addresses.append(business_data['address'])
-                valid_businesses.append(business_data)
-                current_app.logger.info(f"validation status: {validation_status}")
-            else:
-                continue
-
-        address_insertion_results = addresses_collection.insert_many(addresses)
-        address_ids = address_insertion_results.inserted_ids
-
-        for i, business_data in enumerate(valid_businesses):
-            new_business_doc = {
-                "business_name": business_data['business_name'],
-                "organization_type": business_data['organization_type'],
-                "resources_available": business_data['resources_available'],
-                "has_available_resources": business_data['has_available_resources'],
-                "contact_info": business_data['contact_info'],
-                "yearly_revenue": business_data['yearly_revenue'],
-                "employee_count": business_data['employee_count'],
-                "customer_satisfaction": business_data['customer_satisfaction'],
-                "website_traffic": business_data['website_traffic'],
-            }
-            business_docs.append(new_business_doc)
-
-        business_insertion_results = businesses_collection.insert_many(business_docs)
-        business_ids = business_insertion_results.inserted_ids
-
-        for i, business_id in enumerate(business_ids):
-            linker_doc = {
-                "business_id": business_id,
-                "address_id": address_ids[i]
-            }
-            linker_docs.append(linker_doc)
-
-        linker_collection.insert_many(linker_docs)
+    # Batch additions for multiple businesses through the bulk ingestion engine. Returns a per-row report.
+    def add_multiple_businesses(businesses_data, chunk_size=None, transactional=False):
+        report = BulkIngestor.ingest(businesses_data, chunk_size=chunk_size, transactional=transactional)
+        current_app.logger.info(f"Bulk ingestion finished: {report['inserted']} inserted, "
+                                f"{report['invalid']} invalid, {report['failed']} failed")
 
-        return jsonify({"message": f"Successfully added {len(business_docs)} businesses"}), 200
+        report['message'] = f"Successfully added {report['inserted']} businesses"
+        return jsonify(report), 201 if report['inserted'] else 400
         
-    def autocomplete(query):
-        url = "https://api.foursquare.com/v3/places/search"
-
-        headers = {
-            "Accept": "application/json",
-            "Authorization": FOURSQUARE_API_KEY
-        }
-
-        params = {
-            "query": query,
-            "limit": 5  # Adjust limit as needed
+    # Streaming import; only invalid and failed rows are kept in the report so memory stays bounded.
+    def import_businesses(rows, chunk_size, transactional, on_chunk):
+        report = BulkIngestor.ingest(rows, chunk_size=chunk_size, transactional=transactional, on_chunk=on_chunk,
+                                     errors_only=True, max_row_results=MAX_IMPORT_ERRORS)
+        current_app.logger.info(f"Import finished: {report['processed']} rows processed, {report['inserted']} inserted")
+
+        report['message'] = f"Imported {report['inserted']} of {report['processed']} rows"
+        return jsonify(report), 201 if report['inserted'] else 400
+
+    # Ranks businesses with the in-process BM25 index and fills the page in from business_details.
+    def search_businesses(query, filters=None, offset=0, limit=20):
+        if not query and not filters:
+            return jsonify({'error': 'A query or at least one filter is required'}), 400
+        if not 0 < limit <= MAX_SEARCH_PAGE_SIZE or offset < 0:
+            return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_PAGE_SIZE} and offset must not be negative'}), 400
+        if not search_index.built:
+            try:
+                search_index.ensure_built()
+            except Exception as e:
+                current_app.logger.error(f"Failed to build search index: {e}")
+            # Still missing when the build failed just now or recently
+            if not search_index.built:
+                return jsonify({'error': 'Search is unavailable'}), 503
+
+        matches, total = search_index.search(query, filters, offset, limit)
+        business_info = BusinessDetails.load_many([business_id for business_id, _ in matches])
+        results = [
+            dict(business_info[business_id], score=score)
+            for business_id, score in matches if business_id in business_info
+        ]
+        return jsonify({"results": results, "total": total, "offset": offset, "limit": limit})
+
+    # The k businesses nearest to a point (or to a zipcode's centroid), using the 2dsphere index on address
+    # locations. Each business is reported once, at the distance of its closest address.
+    def nearby_businesses(latitude=None, longitude=None, zipcode=None, k=10, max_distance_km=None):
+        if not 0 < k <= MAX_NEARBY_RESULTS:
+            return jsonify({'error': f'k must be between 1 and {MAX_NEARBY_RESULTS}'}), 400
+        if zipcode is not None:
+            if not zipcode_centroids.available:
+                return jsonify({'error': 'Zipcode lookups are unavailable'}), 503
+            centroid = zipcode_centroids.lookup(zipcode)
+            if centroid is None:
+                return jsonify({'error': f'Unknown zipcode: {zipcode}'}), 404
+            latitude, longitude = centroid
+        if latitude is None or longitude is None:
+            return jsonify({'error': 'Either lat and lon or zipcode is required'}), 400
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({'error': 'lat must be within [-90, 90] and lon within [-180, 180]'}), 400
+
+        geo_near = {
+            "near": {"type": "Point", "coordinates": [longitude, latitude]},
+            "distanceField": "distance_m",
+            "key": "location",
+            "spherical": True
         }
+        if max_distance_km is not None:
+            geo_near["maxDistance"] = max_distance_km * 1000
 
-        response = requests.get(url, headers=headers, params=params)
-        return jsonify(response.json())
+        try:
+            matches = list(addresses_collection.aggregate([
+                {"$geoNear": geo_near},
+                {"$limit": k * NEARBY_ADDRESS_FANOUT},
+                {"$lookup": {"from": "linker", "localField": "address_id", "foreignField": "address_id", "as": "links"}},
+                {"$unwind": "$links"},
+                # Input is nearest first, so $first is each business's closest address
+                {"$group": {"_id": "$links.business_id", "distance_m": {"$min": "$distance_m"},
+                            "address_id": {"$first": "$address_id"}}},
+                {"$sort": {"distance_m": 1}},
+                {"$limit": k}
+            ]))
+        except OperationFailure as e:
+            # Most likely the 2dsphere index hasn't been created yet
+            current_app.logger.error(f"Nearby query failed: {e}")
+            return jsonify({'error': 'Nearby search is unavailable'}), 503
+
+        business_info = BusinessDetails.load_many([match['_id'] for match in matches])
+        results = [
+            dict(business_info[match['_id']], address_id=match['address_id'],
+                 distance_km=round(match['distance_m'] / 1000, 3))
+            for match in matches if match['_id'] in business_info
+        ]
+        return jsonify({"origin": {"lat": latitude, "lon": longitude}, "results": results})
+
+    # Inserts, updates and deletes to the business list since a cursor from an earlier call, see
+    # BusinessChangeLog.
+    def get_business_changes(since=0, limit=MAX_PAGE_SIZE):
+        if not 0 < limit <= MAX_CHANGES_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_CHANGES_PAGE_SIZE}'}), 400
+        return jsonify(BusinessChangeLog.changes(since, limit)), 200
+
+    # Dashboard totals per group, read straight from the maintained rollup documents.
+    def get_rollups(dimension='organization_type'):
+        if dimension not in ROLLUP_DIMENSIONS:
+            return jsonify({'error': f'dimension must be one of {", ".join(ROLLUP_DIMENSIONS)}'}), 400
+        return jsonify({"dimension": dimension, "groups": BusinessRollups.summary(dimension)})
+
+    # Cohort statistics over the admin metrics, computed from the in-memory analytics snapshot.
+    def get_analytics(organization_types=None, ranges=None, group_by=None, metrics=None, percentiles=None,
+                      histogram=None, bins=20):
+        unknown_fields = [field for field in list(ranges or {}) + list(metrics or []) + ([histogram] if histogram else [])
+                          if field not in METRIC_FIELDS]
+        if unknown_fields:
+            return jsonify({'error': f'Unknown metrics: {", ".join(unknown_fields)}'}), 400
+        if group_by is not None and group_by not in GROUP_FIELDS:
+            return jsonify({'error': f'group_by must be one of {", ".join(GROUP_FIELDS)}'}), 400
+        if percentiles is not None and not all(0 <= p <= 100 for p in percentiles):
+            return jsonify({'error': 'percentiles must be between 0 and 100'}), 400
+        if not 0 < bins <= MAX_HISTOGRAM_BINS:
+            return jsonify({'error': f'bins must be between 1 and {MAX_HISTOGRAM_BINS}'}), 400
+        if not analytics_snapshot.built:
+            try:
+                analytics_snapshot.ensure_built()
+            except Exception as e:
+                current_app.logger.error(f"Failed to build analytics snapshot: {e}")
+            # Still missing when the build failed just now or recently
+            if not analytics_snapshot.built:
+                return jsonify({'error': 'Analytics are unavailable'}), 503
+
+        result = analytics_snapshot.query(organization_types, ranges, group_by, metrics, percentiles,
+                                          (histogram, bins) if histogram else None)
+        return jsonify(result)
+
+    # Answers from the in-process index; Foursquare is only asked when there are fewer local matches than
+    # AUTOCOMPLETE_FALLBACK_BELOW and the fallback is enabled.
+    def autocomplete(query, limit=None):
+        limit = limit or current_app.config['AUTOCOMPLETE_LIMIT']
+        if not autocomplete_index.built:
+            try:
+                autocomplete_index.ensure_built()
+            except Exception as e:
+                current_app.logger.error(f"Failed to build autocomplete index: {e}")
+
+        results = [dict(match, source="local") for match in autocomplete_index.search(query or '', limit)]
+
+        if (query and current_app.config['AUTOCOMPLETE_FOURSQUARE_FALLBACK']
+                and len(results) < min(limit, current_app.config['AUTOCOMPLETE_FALLBACK_BELOW'])):
+            places = foursquare_proxy.search(query, limit)
+            results.extend(dict(place, source="foursquare") for place in places[:limit - len(results)])
+
+        return jsonify({"results": results[:limit]})
     
     
     def edit_business_info(business_id, business_info):
-        current_app.logger.info(f"request data for edit: {business_info}")
-        
-        # Validate integers for yearly_revenue, employee_count, and website_traffic
-        for field in ['yearly_revenue', 'employee_count', 'website_traffic']:
-            if field in business_info and not isinstance(business_info[field], int):
-                return jsonify({"error": f"{field} must be an integer"}), 400
+        if not isinstance(business_info, dict) or not business_info:
+            return jsonify({"error": "business_info must be a non-empty object"}), 400
+        current_app.logger.info(f"request data for edit of business {business_id}: {list(business_info)}")
 
-        # Validate float or int for customer_satisfaction
-        if 'customer_satisfaction' in business_info:
-            if not isinstance(business_info['customer_satisfaction'], (int, float)):
-                return jsonify({"error": "Customer satisfaction must be a number (integer or float)"}), 400
+        # Ids and addresses tie the business to its read model, rollups and links, so they can't be set here
+        unknown_fields = [field for field in business_info if field not in EDITABLE_BUSINESS_FIELDS]
+        if unknown_fields:
+            errors = [f'Field cannot be edited: {field}' for field in unknown_fields]
+            return jsonify({"error": errors[0], "errors": errors}), 400
+
+        # Only the fields being changed are validated
+        errors = business_update_validator.validate(business_info)
+        if errors:
+            return jsonify({"error": errors[0], "errors": errors}), 400
 
         try:
-            result = businesses_collection.update_one(
+            # The previous values are needed to move this business between rollups
+            before = businesses_collection.find_one_and_update(
                 {"business_id": business_id},
-                {"$set": business_info}
+                {"$set": business_info},
+                projection={field: 1 for field in ROLLUP_FIELDS + list(business_info)},
+                return_document=ReturnDocument.BEFORE
             )
-            if result.matched_count == 0:
+            if before is None:
                 return jsonify({"error": "Business not found"}), 404
-            elif result.modified_count == 0:
+            elif all(before.get(field) == value for field, value in business_info.items()):
                 return jsonify({"error": "No changes were made"}), 200
 
+            BusinessRollups.record(before=[before], after=[dict(before, **business_info)])
+            BusinessViews.sync(changed_ids=[business_id])
             return jsonify({"message": "Business information updated successfully"}), 200
         except ValueError as e:
             return jsonify({"error": str(e)}), 404
         except Exception as e:
             return jsonify({"error": "An error occurred"}), 500
         
+    # Batch version of edit_business_info/edit_business_address with a per-item matched/modified report
+    def bulk_edit(business_edits, address_edits):
+        result = {
+            "businesses": BulkEditor.edit_businesses(business_edits),
+            "addresses": BulkEditor.edit_addresses(address_edits)
+        }
+        items = result["businesses"] + result["addresses"]
+        result["matched"] = sum(1 for item in items if item['matched'])
+        result["modified"] = sum(1 for item in items if item['modified'])
+        return jsonify(result), 200
+
     def delete_business_address(address_id):
         # Delete the address document
         address_delete_result = addresses_collection.delete_one({"address_id": address_id})
@@ -248,27 +415,22 @@ class DataHandler:
             return jsonify({"error": "Address not found or already deleted"}), 404
 
         # Delete the link document in the linker collection
-        linker_delete_result = linker_collection.delete_one({"address_id": address_id})
-        if linker_delete_result.deleted_count == 0:
+        link = linker_collection.find_one_and_delete({"address_id": address_id})
+        if link is None:
             return jsonify({"message": "Address deleted successfully, but no linked record found"}), 200
 
+        BusinessViews.sync(changed_ids=[link['business_id']], list_changed=False)
         return jsonify({"message": "Address and its link deleted successfully"}), 200
 
     def add_business_address(business_id, address_data):
-        address = Address()
-        address_id = DataHandler.get_next_address_id()
-
-        address_fields = ['line1', 'city', 'state', 'zipcode', 'country']
         if not address_data or not isinstance(address_data, dict):
             return jsonify({'error': 'Missing or invalid address field'}), 400
-        for address_field in address_fields:
-            if address_field not in address_data or not address_data[address_field].strip():
-                return jsonify({'error': f'Missing or empty address field: {address_field}'}), 400
+        errors = address_validator.validate(address_data)
+        if errors:
+            return jsonify({'error': errors[0], 'errors': errors}), 400
 
-        # Validate zipcode format
-        if not re.match(r'^\d{5}$', address_data['zipcode']):
-            return jsonify({'error': 'Invalid zipcode format.'}), 400
-        
+        address = Address()
+        address_id = DataHandler.get_next_address_id()
         address.add_address(
             address_id=address_id,
             address_line_1=address_data['line1'],
@@ -279,11 +441,12 @@ class DataHandler:
             country=address_data['country']
         )
 
-        addresses_collection.insert_one(address.to_dict())
+        addresses_collection.insert_one(zipcode_centroids.attach(address.to_dict()))
         
         linker = Linker()
         linker.add_link(business_id, address_id)
         linker_collection.insert_one(linker.to_dict())
+        BusinessViews.sync(changed_ids=[business_id], list_changed=False)
 
         return jsonify({"message": "Address added successfully"}), 200
     
@@ -300,22 +463,28 @@ class DataHandler:
 
             if not address_data or not isinstance(address_data, dict):
                 return jsonify({'error': 'Missing or invalid address field'}), 400
+            errors = address_update_validator.validate(address_data)
+            if errors:
+                return jsonify({'error': errors[0], 'errors': errors}), 400
+
+            update_data = {
+                db_field: address_data[input_field]
+                for input_field, db_field in field_mapping.items()
+                if input_field in address_data and address_data[input_field].strip()
+            }
 
-            update_data = {}
-            for input_field, db_field in field_mapping.items():
-                if input_field in address_data and address_data[input_field].strip():
-                    update_data[db_field] = address_data[input_field]
-                elif db_field != 'address_line_2':  # Skip optional field
-                    return jsonify({'error': f'Missing or empty required field: {input_field}'}), 400
-
-            # Validate zipcode format
-            if 'zipcode' in update_data and not re.match(r'^\d{5}$', update_data['zipcode']):
-                return jsonify({'error': 'Invalid zipcode format.'}), 400
+            # A new zipcode moves the address's location along with it
+            update = {'$set': update_data}
+            if 'zipcode' in update_data:
+                location_update = zipcode_centroids.location_update(update_data['zipcode'])
+                update['$set'].update(location_update.get('$set', {}))
+                if '$unset' in location_update:
+                    update['$unset'] = location_update['$unset']
 
             # Update the address in the database
             update_result = addresses_collection.update_one(
                 {'address_id': address_id},
-                {'$set': update_data}
+                update
             )
 
             if update_result.matched_count == 0:
@@ -323,6 +492,8 @@ class DataHandler:
             elif update_result.modified_count == 0:
                 return jsonify({'error': 'No changes were made'}), 200
 
+            linked_business_ids = linker_collection.distinct('business_id', {'address_id': address_id})
+            BusinessViews.sync(changed_ids=linked_business_ids, list_changed=False)
             return jsonify({'message': 'Address updated successfully'}), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -345,62 +516,25 @@ class DataHandler:
                 json_backup = f'{collection_name}_backup.json'
 
                 # Upload each collection's data to the bucket
-                fbla_bucket.upload_fileobj(Fileobj=data_stream, Key=json_backup)
+                cos.Bucket(BACKUP_BUCKET).upload_fileobj(Fileobj=data_stream, Key=json_backup)
 
             return jsonify({"message": "Database backup success!"}), 200
 
         except Exception as e:
             return jsonify({"error": str(e)}), 400
   
+    # Validates a full business payload against BUSINESS_SCHEMA. Every problem is listed under 'errors';
+    # 'error' carries the first one for callers that only show a single message.
     @staticmethod
     def validate_data(business_data):
-        current_app.logger.info(f"Received business data in validate_data method: {business_data}")
-        required_fields = ['business_name', 'organization_type', 'resources_available', 
-                        'has_available_resources', 'contact_info', 'yearly_revenue', 
-                        'employee_count', 'customer_satisfaction', 'website_traffic']
-
-        for field in required_fields:
-            if field not in business_data or (isinstance(business_data[field], str) and not business_data[field].strip()):
-                current_app.logger.info(f"Validation failed: Missing or empty required field: {field}")
-                return {'error': f'Missing or empty required field: {field}'}, 400
-            if field == 'has_available_resources' and not isinstance(business_data[field], bool):
-                current_app.logger.info(f"Validation failed: Invalid data type for field: {field}")
-                return {'error': f'Invalid data type for field: {field}'}, 400
-            if field in ['yearly_revenue', 'employee_count', 'website_traffic'] and not isinstance(business_data[field], int):
-                current_app.logger.info(f"Validation failed: Invalid data type for field: {field}. Expected integer.")
-                return {'error': f'Invalid data type for field: {field}. Expected integer.'}, 400
-            if field == 'customer_satisfaction' and not isinstance(business_data[field], (float, int)):
-                current_app.logger.info(f"Validation failed: Invalid data type for field: {field}. Expected float or integer.")
-                return {'error': f'Invalid data type for field: {field}. Expected float or integer.'}, 400
-
-        contact_info = business_data.get('contact_info', '')
-        phone_number_pattern = r'^\d{10,11}$'
-        if not re.match(phone_number_pattern, contact_info):
-            current_app.logger.info(f"Validation failed: Invalid phone number format. Expected 10 or 11 digits.")
-            return {'error': 'Invalid phone number format. Expected 10 or 11 digits.'}, 400
-        
-        if isinstance(business_data.get('has_available_resources'), str):
-            if business_data['has_available_resources'].lower() == 'true':
-                business_data['has_available_resources'] = True
-            elif business_data['has_available_resources'].lower() == 'false':
-                business_data['has_available_resources'] = False
-
-        address_fields = ['line1', 'city', 'state', 'zipcode', 'country']
-        if 'address' not in business_data or not isinstance(business_data['address'], dict):
-            current_app.logger.info(f"Validation failed: Missing or invalid address field.")
-            return {'error': 'Missing or invalid address field'}, 400
-        for address_field in address_fields:
-            if address_field not in business_data['address'] or not business_data['address'][address_field].strip():
-                current_app.logger.info(f"Validation failed: Missing or empty address field: {address_field}")
-                return {'error': f'Missing or empty address field: {address_field}'}, 400
-
-        if not re.match(r'^\d{5}$', business_data['address']['zipcode']):
-            current_app.logger.info(f"Validation failed: Invalid zipcode format.")
-            return {'error': 'Invalid zipcode format.'}, 400
-        
-        current_app.logger.info(f"Data validated successfully: {business_data}")
+        errors = business_validator.validate(business_data)
+        if errors:
+            current_app.logger.debug(f"Validation failed: {errors}")
+            return {'error': errors[0], 'errors': errors}, 400
         return {'message': 'Data validated successfully.'}, 200
         
+    # Builds the address, business and link documents locally from pre-leased IDs and commits them in one
+    # transaction. The response is the business document as written, so nothing is read back.
     @staticmethod
     def add_business_data(business_data):
         # Create Address instance and add address
@@ -416,9 +550,6 @@ class DataHandler:
             country=business_data['address']['country']
         )
 
-        # Insert address data into addresses_collection
-        addresses_collection.insert_one(address.to_dict())
-
         # Create new business without the address
         new_business = Business(
             business_name=business_data['business_name'],
@@ -433,38 +564,36 @@ class DataHandler:
         )
         new_business.business_id = DataHandler.get_next_business_id()
 
-        # Insert the new business
-        insert_result = businesses_collection.insert_one(new_business.to_dict())
-        inserted_id = insert_result.inserted_id
-
         linker = Linker()
         linker.add_link(new_business.business_id, address_id)
 
-        # Insert link data into linker_collection
-        linker_collection.insert_one(linker.to_dict())
+        address_doc = zipcode_centroids.attach(address.to_dict())
+        business_doc = new_business.to_dict()
+        linker_doc = linker.to_dict()
+
+        def write_business(session):
+            addresses_collection.insert_one(address_doc, session=session)
+            businesses_collection.insert_one(business_doc, session=session)
+            linker_collection.insert_one(linker_doc, session=session)
+            BusinessRollups.record(after=[business_doc], session=session)
 
-        # Retrieve the inserted business data
-        inserted_business = businesses_collection.find_one({'_id': inserted_id})
-        if inserted_business:
-            inserted_business['_id'] = str(inserted_business['_id'])  # Convert ObjectId to string
-            return jsonify(inserted_business), 201
-        else:
-            return jsonify({'error': 'Failed to retrieve the added business'}), 500
+        Transactions.run(write_business)
+        BusinessViews.sync(details=[BusinessDetails.build(business_doc, [address_doc])])
+        return jsonify(business_doc), 201
         
+    # IDs come from ranges leased off the counters collection, see IdAllocator
     @staticmethod
     def get_next_business_id():
-        result = counters_collection.find_one_and_update(
-            {'_id': 'business_id'},
-            {'$inc': {'seq': 1}},
-            return_document=True
-        )
-        return result['seq']
+        return business_id_allocator.next()
     
     @staticmethod
     def get_next_address_id():
-        result = counters_collection.find_one_and_update(
-            {'_id': 'address_id'},
-            {'$inc': {'seq': 1}},
-            return_document=True
-        )
-        return result['seq']
\ No newline at end of file
+        return address_id_allocator.next()
+
+    @staticmethod
+    def get_next_business_ids(count):
+        return business_id_allocator.allocate(count)
+
+    @staticmethod
+    def get_next_address_ids(count):
+        return address_id_allocator.allocate(count)
\ No newline at end of file
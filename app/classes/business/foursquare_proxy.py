@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from redis.exceptions import RedisError
+from flask import current_app
+from app import app, redis_client
+
+CACHE_KEY_PREFIX = 'foursquare:search'
+
+# One upstream call in progress; identical misses that arrive meanwhile wait on it instead of calling out too.
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+# Caching proxy in front of the Foursquare places search. Queries are normalized, results live in a
+# per-process LRU backed by a shared Redis TTL cache, concurrent misses for the same query are collapsed
+# into one upstream call, and the upstream itself is reached over a pooled keep-alive session with strict
+# timeouts behind a circuit breaker. Every failure degrades to "no results" so autocomplete keeps working
+# from the local index.
+class FoursquareProxy:
+    def __init__(self, api_url, api_key, cache_size=1024, cache_ttl=3600, connect_timeout=1.0, read_timeout=2.0,
+                 failure_threshold=5, reset_after=30, pool_size=10):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.timeout = (connect_timeout, read_timeout)
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.pool_size = pool_size
+
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()  # key -> (expires_at, results)
+        self.flights = {}
+        self.failures = 0
+        self.open_until = 0
+        self.pid = None
+        self.session = None
+        self.stats = {"hits": 0, "redis_hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0,
+                      "upstream_errors": 0, "short_circuited": 0}
+
+    @staticmethod
+    def normalize(query):
+        return ' '.join((query or '').lower().split())
+
+    def search(self, query, limit=5):
+        normalized = FoursquareProxy.normalize(query)
+        if not normalized or not self.api_key:
+            return []
+        key = f"{CACHE_KEY_PREFIX}:{limit}:{normalized}"
+
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached[1]
+
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait(sum(self.timeout))
+            return flight.result or []
+
+        try:
+            flight.result = self._load(key, normalized, limit)
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+            flight.done.set()
+        return flight.result
+
+    def _load(self, key, normalized, limit):
+        try:
+            cached = redis_client.get(key)
+            if cached is not None:
+                results = json.loads(cached)
+                self.stats["redis_hits"] += 1
+                self._remember(key, results)
+                return results
+        except (RedisError, ValueError) as e:
+            current_app.logger.warning(f"Foursquare cache read failed: {e}")
+
+        results = self._fetch(normalized, limit)
+        if results is None:
+            return []
+
+        self._remember(key, results)
+        try:
+            redis_client.setex(key, self.cache_ttl, json.dumps(results))
+        except RedisError as e:
+            current_app.logger.warning(f"Foursquare cache write failed: {e}")
+        return results
+
+    def _remember(self, key, results):
+        with self.lock:
+            self.cache[key] = (time.monotonic() + self.cache_ttl, results)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    # Returns the upstream results, or None when the call failed or the breaker is open.
+    def _fetch(self, normalized, limit):
+        with self.lock:
+            if self.open_until > time.monotonic():
+                self.stats["short_circuited"] += 1
+                return None
+            if self.failures >= self.failure_threshold:
+                # Half-open: let this call through as a probe and keep the breaker shut for everyone else
+                self.open_until = time.monotonic() + self.reset_after
+            self.stats["upstream_calls"] += 1
+
+        try:
+            response = self._session().get(
+                self.api_url,
+                headers={"Accept": "application/json", "Authorization": self.api_key},
+                params={"query": normalized, "limit": limit},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            results = response.json().get('results', [])
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            with self.lock:
+                self.stats["upstream_errors"] += 1
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self.open_until = time.monotonic() + self.reset_after
+            current_app.logger.warning(f"Foursquare search failed ({self.failures} in a row): {e}")
+            return None
+
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0
+        return results
+
+    # Sessions aren't shared across a fork; each worker opens its own pool.
+    def _session(self):
+        with self.lock:
+            if self.session is None or self.pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.session, self.pid = session, os.getpid()
+            return self.session
+
+foursquare_proxy = FoursquareProxy(
+    app.config['FOURSQUARE_API_URL'],
+    app.config['FOURSQUARE_API_KEY'],
+    cache_size=app.config['FOURSQUARE_CACHE_SIZE'],
+    cache_ttl=app.config['FOURSQUARE_CACHE_TTL'],
+    connect_timeout=app.config['FOURSQUARE_CONNECT_TIMEOUT'],
+    read_timeout=app.config['FOURSQUARE_READ_TIMEOUT'],
+    failure_threshold=app.config['FOURSQUARE_BREAKER_THRESHOLD'],
+    reset_after=app.config['FOURSQUARE_BREAKER_RESET']
+)
@@ -0,0 +1,57 @@
+import os
+import threading
+from pymongo import ReturnDocument
+from app import app, db
+
+counters_collection = db.counters
+
+# Hands out integer IDs from ranges leased off a `counters` document, so the hot counter is touched once per
+# lease instead of once per insert. The counter's `seq` always holds the highest ID leased so far, which keeps
+# it compatible with the existing schema. IDs are monotonic within a process; the unused tail of a lease is
+# simply skipped when the process exits, so IDs are unique but not gap-free.
+class IdAllocator:
+    def __init__(self, counter_name, lease_size):
+        self.counter_name = counter_name
+        self.lease_size = lease_size
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.next_id = 1
+        self.lease_end = 0
+
+    def next(self):
+        return self.allocate(1)[0]
+
+    # Returns `count` consecutive-where-possible IDs, leasing a new range if the current one runs out.
+    def allocate(self, count):
+        with self.lock:
+            # A forked worker must not hand out IDs from the lease it inherited from its parent
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.next_id, self.lease_end = 1, 0
+
+            ids = []
+            available = self.lease_end - self.next_id + 1
+            if available > 0:
+                taken = min(available, count)
+                ids.extend(range(self.next_id, self.next_id + taken))
+                self.next_id += taken
+
+            remaining = count - len(ids)
+            if remaining > 0:
+                lease_start, lease_end = self._lease(max(remaining, self.lease_size))
+                ids.extend(range(lease_start, lease_start + remaining))
+                self.next_id, self.lease_end = lease_start + remaining, lease_end
+
+            return ids
+
+    def _lease(self, size):
+        result = counters_collection.find_one_and_update(
+            {'_id': self.counter_name},
+            {'$inc': {'seq': size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return result['seq'] - size + 1, result['seq']
+
+business_id_allocator = IdAllocator('business_id', app.config['ID_LEASE_SIZE'])
+address_id_allocator = IdAllocator('address_id', app.config['ID_LEASE_SIZE'])
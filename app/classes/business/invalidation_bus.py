@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import socket
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from redis.exceptions import RedisError
+from app import app, db, redis_client
+from .autocomplete_index import autocomplete_index
+from .search_index import search_index
+from .analytics_snapshot import analytics_snapshot
+
+business_details_collection = db.business_details
+
+CHANNEL = "businesses:invalidate"
+WATCHED_OPERATIONS = ['insert', 'update', 'replace', 'delete']
+BATCH_SIZE = 500
+AWAIT_MS = 50
+RETRY_DELAY = 1.0
+MAX_RECENT_WRITES = 10000
+
+# Keeps the in-process business indexes of every worker in step with writes made anywhere else: other
+# workers, the AI tool path, or maintenance commands such as rebuild-business-details. Each worker runs one
+# background listener, started on its first request so it lives in the forked process. The source is a
+# change stream on business_details when MongoDB supports it (replica sets), which sees every write to the
+# read model no matter who made it; otherwise it is the Redis channel BusinessViews.sync publishes to. Events
+# a worker caused itself are skipped since sync already applied them. When the listener loses its source
+# long enough to miss events, every local index is rebuilt from MongoDB instead.
+class InvalidationBus:
+    def __init__(self, source='auto', enabled=True):
+        self.source = source
+        self.enabled = enabled
+        self.indexes = []
+        self.lock = threading.Lock()
+        self.pid = None
+        self.origin = None
+        self.thread = None
+        self.active_source = None
+        self.recent = OrderedDict()  # business_id -> synced_at of this worker's own writes, None for removals
+        self.stats = {"events": 0, "skipped": 0, "resyncs": 0}
+
+    # Local indexes need build(), apply(details, deleted_ids) and a `built` flag.
+    def register(self, index):
+        self.indexes.append(index)
+
+    def init_app(self, app):
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        if self.pid == os.getpid() and self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            self.identify()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.listen, name="invalidation-bus", daemon=True)
+                self.thread.start()
+
+    # Threads and connections don't survive a fork, so a child process starts over under its own identity.
+    def identify(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.origin = f"{socket.gethostname()}:{self.pid}:{secrets.token_hex(4)}"
+            self.recent = OrderedDict()
+            self.thread = None
+
+    # Called by BusinessViews.sync once the local indexes have the write.
+    def publish(self, documents=(), removed_ids=()):
+        if not self.enabled:
+            return
+        changed_ids = [document['business_id'] for document in documents]
+        with self.lock:
+            self.identify()
+            for document in documents:
+                self.remember(document['business_id'], stored_time(document.get('synced_at')))
+            for business_id in removed_ids:
+                self.remember(business_id, None)
+        if changed_ids or removed_ids:
+            self.send({"changed": changed_ids, "removed": list(removed_ids)})
+
+    # Tells every worker to rebuild its indexes, for bulk rewrites done outside the app.
+    def publish_resync(self):
+        if self.enabled:
+            self.send({"resync": True})
+
+    def send(self, event):
+        event["origin"] = self.origin
+        try:
+            redis_client.publish(CHANNEL, json.dumps(event))
+        except RedisError as e:
+            logging.error(f"Failed to publish business invalidation: {e}")
+
+    def remember(self, business_id, synced_at):
+        self.recent.pop(business_id, None)
+        self.recent[business_id] = synced_at
+        while len(self.recent) > MAX_RECENT_WRITES:
+            self.recent.popitem(last=False)
+
+    def listen(self):
+        use_change_stream = self.source in ('auto', 'change_stream')
+        while True:
+            try:
+                if use_change_stream:
+                    self.watch_changes()
+                else:
+                    self.watch_channel()
+            except Exception as e:
+                # BusinessViews.sync always publishes to Redis, so it is a complete source on its own
+                if self.source == 'auto' and use_change_stream and self.active_source is None:
+                    logging.info(f"Change streams unavailable ({e}), listening for invalidations on Redis instead")
+                    use_change_stream = False
+                    continue
+                logging.error(f"Business invalidation listener lost its source, retrying: {e}")
+            self.active_source = None
+            time.sleep(RETRY_DELAY)
+            # Whatever happened while disconnected is unknown, so start over from a clean copy
+            self.resync()
+
+    def watch_changes(self):
+        pipeline = [{"$match": {"operationType": {"$in": WATCHED_OPERATIONS + ['invalidate', 'drop']}}}]
+        with business_details_collection.watch(pipeline, full_document='updateLookup',
+                                               max_await_time_ms=AWAIT_MS) as stream:
+            self.active_source = 'change_stream'
+            changed, removed = {}, set()
+            while stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    if change['operationType'] not in WATCHED_OPERATIONS:
+                        return
+                    business_id = change['documentKey']['_id']
+                    document = change.get('fullDocument')
+                    if self.is_own(business_id, document):
+                        continue
+                    if document is None:
+                        changed.pop(business_id, None)
+                        removed.add(business_id)
+                    else:
+                        removed.discard(business_id)
+                        changed[business_id] = document
+                    if len(changed) + len(removed) < BATCH_SIZE:
+                        continue
+                if changed or removed:
+                    self.apply(list(changed.values()), removed)
+                    changed, removed = {}, set()
+
+    def watch_channel(self):
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(CHANNEL)
+            self.active_source = 'pubsub'
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                event = json.loads(message['data'])
+                if event.get('origin') == self.origin:
+                    continue
+                if event.get('resync'):
+                    self.resync()
+                    continue
+                removed = set(event.get('removed', []))
+                documents = list(business_details_collection.find({"_id": {"$in": event.get('changed', [])}}))
+                removed |= set(event.get('changed', [])) - {document['business_id'] for document in documents}
+                self.apply(documents, removed)
+        finally:
+            pubsub.close()
+
+    # Whether a change stream event is the echo of a write this worker made and already applied.
+    def is_own(self, business_id, document):
+        with self.lock:
+            if business_id not in self.recent:
+                return False
+            synced_at = self.recent.pop(business_id)
+        own = synced_at is None if document is None else synced_at == document.get('synced_at')
+        if own:
+            self.stats["skipped"] += 1
+        return own
+
+    def apply(self, documents, removed_ids):
+        self.stats["events"] += len(documents) + len(removed_ids)
+        removed_ids = list(removed_ids)
+        for index in self.indexes:
+            if index.built:
+                index.apply(documents, removed_ids)
+
+    def resync(self):
+        self.stats["resyncs"] += 1
+        for index in self.indexes:
+            if index.built:
+                try:
+                    index.build()
+                except Exception as e:
+                    logging.error(f"Failed to rebuild {type(index).__name__}: {e}")
+
+# MongoDB keeps datetimes to the millisecond, so a change event carries synced_at truncated to that.
+def stored_time(value):
+    if value is None:
+        return None
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+invalidation_bus = InvalidationBus(app.config['INVALIDATION_BUS_SOURCE'], app.config['INVALIDATION_BUS_ENABLED'])
+invalidation_bus.register(autocomplete_index)
+invalidation_bus.register(search_index)
+invalidation_bus.register(analytics_snapshot)
@@ -0,0 +1,49 @@
+import time
+import threading
+
+# How long requests wait before trying again after a failed build
+BUILD_RETRY_SECONDS = 30
+
+# Rebuilds of the in-process business indexes. A build scans MongoDB into a fresh instance without holding
+# the index lock, so queries and writes carry on against the current copy meanwhile; writes applied during
+# the scan are recorded and replayed onto the fresh copy before it is swapped in. Subclasses create `lock`,
+# implement _scan() and _adopt(fresh), and call _track() at the start of apply() with the lock held.
+class RebuildableIndex:
+    def __init__(self):
+        self.build_lock = threading.Lock()
+        self.built = False
+        self.building = False
+        self.missed = []  # (details, deleted_ids) applied while a build was scanning
+        self.failed_at = None
+
+    # Replaces whatever the index held with a fresh scan. With only_if_missing, a caller that waited for
+    # another thread's build doesn't scan again.
+    def build(self, only_if_missing=False):
+        with self.build_lock:
+            if only_if_missing and self.built:
+                return
+            with self.lock:
+                self.building, self.missed = True, []
+            try:
+                fresh = self._scan()
+            except Exception:
+                with self.lock:
+                    self.building, self.missed = False, []
+                self.failed_at = time.monotonic()
+                raise
+            with self.lock:
+                for details, deleted_ids in self.missed:
+                    fresh.apply(details, deleted_ids)
+                self._adopt(fresh)
+                self.building, self.missed = False, []
+                self.built, self.failed_at = True, None
+
+    # Builds the index on demand, unless the last attempt failed less than BUILD_RETRY_SECONDS ago.
+    def ensure_built(self):
+        if self.built or (self.failed_at is not None and time.monotonic() - self.failed_at < BUILD_RETRY_SECONDS):
+            return
+        self.build(only_if_missing=True)
+
+    def _track(self, details, deleted_ids):
+        if self.building:
+            self.missed.append((list(details), list(deleted_ids)))
@@ -0,0 +1,118 @@
+import math
+from pymongo import UpdateOne, ReplaceOne
+from app import db
+
+businesses_collection = db.businesses
+rollups_collection = db.business_rollups
+
+# Dimensions a rollup document is kept for; 'all' is the single overall total
+DIMENSIONS = ['organization_type']
+METRIC_FIELDS = ['yearly_revenue', 'employee_count', 'customer_satisfaction', 'website_traffic']
+ROLLUP_FIELDS = ['business_id', 'has_available_resources'] + DIMENSIONS + METRIC_FIELDS
+COUNTER_FIELDS = ['count', 'with_resources'] + [f'{field}_{suffix}' for field in METRIC_FIELDS for suffix in ('sum', 'count')]
+
+def rollup_keys(business):
+    keys = [{"dimension": "all", "value": None}]
+    for dimension in DIMENSIONS:
+        value = business.get(dimension)
+        keys.append({"dimension": dimension, "value": value if isinstance(value, str) else None})
+    return keys
+
+# The counters a single business adds to every rollup it belongs to.
+def contribution(business):
+    counters = {"count": 1, "with_resources": 1 if business.get('has_available_resources') is True else 0}
+    for field in METRIC_FIELDS:
+        value = business.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+            counters[f'{field}_sum'] = value
+            counters[f'{field}_count'] = 1
+    return counters
+
+def rollup_id(key):
+    return f"{key['dimension']}:{'' if key['value'] is None else key['value']}"
+
+# Per-dimension summary documents in the business_rollups collection (counts, metric sums and the number
+# of businesses with resources available). Every write path passes the affected businesses as they were
+# before and after the write, and the difference is applied with $inc, so the documents stay correct under
+# concurrent writers and, inside a transaction, commit or roll back with the write itself. Dashboards read
+# one small document per group. reconcile() rebuilds them from scratch to catch anything that slipped past.
+class BusinessRollups:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def record(before=(), after=(), session=None):
+        deltas = {}
+        for businesses, sign in ((before, -1), (after, 1)):
+            for business in businesses:
+                if business is None:
+                    continue
+                counters = contribution(business)
+                for key in rollup_keys(business):
+                    entry = deltas.setdefault(rollup_id(key), (key, {}))[1]
+                    for field, value in counters.items():
+                        entry[field] = entry.get(field, 0) + sign * value
+
+        operations = []
+        for document_id, (key, counters) in deltas.items():
+            counters = {field: value for field, value in counters.items() if value != 0}
+            if counters:
+                operations.append(UpdateOne(
+                    {"_id": document_id},
+                    {"$inc": counters, "$setOnInsert": key},
+                    upsert=True
+                ))
+        if operations:
+            rollups_collection.bulk_write(operations, ordered=False, session=session)
+
+    # Rollup documents with averages and the share with resources filled in, largest groups first.
+    @staticmethod
+    def summary(dimension='organization_type'):
+        groups = []
+        for document in rollups_collection.find({"dimension": dimension}):
+            count = document.get('count', 0)
+            if count <= 0:
+                continue
+            group = {"value": document['value'], "count": count,
+                     "with_resources": document.get('with_resources', 0),
+                     "share_with_resources": document.get('with_resources', 0) / count}
+            for field in METRIC_FIELDS:
+                total, values = document.get(f'{field}_sum', 0), document.get(f'{field}_count', 0)
+                group[field] = {"sum": total, "average": total / values if values else None}
+            groups.append(group)
+        groups.sort(key=lambda group: group['count'], reverse=True)
+        return groups
+
+    # Recomputes every rollup from the businesses collection with the same contribution() the write paths
+    # use and returns the documents that had drifted. With apply=True the stored rollups are replaced by the
+    # recomputed ones. Writes that land while the scan runs can show up as drift; re-run to confirm.
+    @staticmethod
+    def reconcile(apply=False):
+        expected = {}
+        projection = {"_id": 0, **{field: 1 for field in ROLLUP_FIELDS}}
+        for business in businesses_collection.find({}, projection).batch_size(1000):
+            counters = contribution(business)
+            for key in rollup_keys(business):
+                document = expected.setdefault(rollup_id(key), dict(key))
+                for field, value in counters.items():
+                    document[field] = document.get(field, 0) + value
+
+        stored = {document['_id']: document for document in rollups_collection.find({})}
+        drift = []
+        for document_id in sorted(set(expected) | set(stored)):
+            want, have = expected.get(document_id, {}), stored.get(document_id, {})
+            for field in COUNTER_FIELDS:
+                wanted, actual = want.get(field, 0), have.get(field, 0)
+                if not math.isclose(wanted, actual, rel_tol=1e-9, abs_tol=1e-6):
+                    drift.append({"rollup": document_id, "field": field, "expected": wanted, "actual": actual})
+
+        if apply and drift:
+            operations = [ReplaceOne({"_id": document_id}, dict(document, _id=document_id), upsert=True)
+                          for document_id, document in expected.items()]
+            if operations:
+                rollups_collection.bulk_write(operations, ordered=False)
+            stale_ids = list(set(stored) - set(expected))
+            if stale_ids:
+                rollups_collection.delete_many({"_id": {"$in": stale_ids}})
+
+        return {"rollups": len(expected), "drift": drift}
@@ -0,0 +1,234 @@
+import math
+import logging
+import threading
+import numpy as np
+from app import db
+from .autocomplete_index import tokenize
+from .rebuildable_index import RebuildableIndex
+
+business_details_collection = db.business_details
+
+# Term frequency weights per field, so a match in the name counts for more than one in the resources
+FIELD_WEIGHTS = {'business_name': 3.0, 'organization_type': 2.0, 'resources_available': 1.0, 'city': 1.0, 'state': 1.0}
+FILTER_FIELDS = ('organization_type', 'city', 'state', 'has_available_resources')
+K1 = 1.2
+B = 0.75
+# Dead slots are compacted away once they make up this share of the index
+COMPACT_RATIO = 0.25
+COMPACT_MIN_DEAD = 1000
+
+# Append-only numpy array that doubles its capacity as it grows.
+class Column:
+    __slots__ = ('data', 'size')
+
+    def __init__(self, dtype, values=None):
+        self.data = np.asarray(values, dtype=dtype) if values is not None else np.empty(4, dtype=dtype)
+        self.size = len(values) if values is not None else 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+def filter_value(value):
+    return str(value).strip().lower()
+
+# Extracts the weighted terms and the filter keys of a business from its detail document (see BusinessDetails).
+def document_terms(document):
+    info = document['admin']['business_info']
+    addresses = document['admin']['addresses']
+    fields = {field: info.get(field) for field in ('business_name', 'organization_type', 'resources_available')}
+    fields['city'] = [address.get('city') for address in addresses if address.get('city')]
+    fields['state'] = [address.get('state') for address in addresses if address.get('state')]
+
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(fields[field]):
+            terms[term] = terms.get(term, 0.0) + weight
+
+    filters = {('organization_type', filter_value(info.get('organization_type'))),
+               ('has_available_resources', filter_value(info.get('has_available_resources')))}
+    for field in ('city', 'state'):
+        filters.update((field, filter_value(value)) for value in fields[field])
+    return terms, filters
+
+# In-process BM25 index over business name, organization type, resources and address city/state. Every
+# indexed version of a business occupies a slot; postings are numpy arrays of (slot, term frequency) so a
+# query is a handful of vectorized scatter-adds into one score array. Updates append a new slot and mark the
+# old one dead, and dead slots are compacted away in bulk. Document frequencies count dead postings until
+# the next compaction, which keeps them cheap to maintain at the cost of a slightly stale idf.
+class SearchIndex(RebuildableIndex):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}        # term -> (slots Column, tf Column)
+        self.filters = {}         # (field, value) -> slots Column
+        self.slots = {}           # business_id -> live slot
+        self.business_ids = Column(np.int64)
+        self.doc_lengths = Column(np.float32)
+        self.alive = Column(np.bool_)
+        self.total_length = 0.0
+        self.dead = 0
+
+    # Loads every materialized business_details document; see RebuildableIndex for how it replaces the index.
+    def _scan(self):
+        fresh = SearchIndex()
+        fresh._append(business_details_collection.find(
+            {}, {"business_id": 1, "admin.business_info": 1, "admin.addresses.city": 1, "admin.addresses.state": 1}
+        ))
+        return fresh
+
+    def _adopt(self, fresh):
+        self.postings, self.filters, self.slots = fresh.postings, fresh.filters, fresh.slots
+        self.business_ids, self.doc_lengths, self.alive = fresh.business_ids, fresh.doc_lengths, fresh.alive
+        self.total_length, self.dead = fresh.total_length, fresh.dead
+        logging.info(f"Search index built with {self.alive.size} businesses and {len(self.postings)} terms")
+
+    # Applies business detail documents and deletions from the write paths.
+    def apply(self, details=(), deleted_ids=()):
+        # Only the last document per business counts if a batch holds several
+        details = {document['business_id']: document for document in details}
+        with self.lock:
+            self._track(details.values(), deleted_ids)
+            for business_id in list(deleted_ids) + list(details):
+                self._remove(business_id)
+            self._append(details.values())
+            if self.dead >= COMPACT_MIN_DEAD and self.dead > COMPACT_RATIO * self.alive.size:
+                self._compact()
+
+    # New postings are gathered per term first, so each column is extended once per batch of businesses
+    # rather than once per business.
+    def _append(self, documents):
+        postings, filters = {}, {}
+        business_ids, doc_lengths = [], []
+        for document in documents:
+            # Legacy documents without an integer business_id can't be addressed by the index
+            if not isinstance(document.get('business_id'), int):
+                continue
+            terms, filter_keys = document_terms(document)
+            slot = self.alive.size + len(business_ids)
+            self.slots[document['business_id']] = slot
+            business_ids.append(document['business_id'])
+            doc_lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                slots, frequencies = postings.setdefault(term, ([], []))
+                slots.append(slot)
+                frequencies.append(frequency)
+            for key in filter_keys:
+                filters.setdefault(key, []).append(slot)
+
+        if not business_ids:
+            return
+        for term, (slots, frequencies) in postings.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (Column(np.int32), Column(np.float32))
+            entry[0].extend(slots)
+            entry[1].extend(frequencies)
+        for key, slots in filters.items():
+            if key not in self.filters:
+                self.filters[key] = Column(np.int32)
+            self.filters[key].extend(slots)
+        self.business_ids.extend(business_ids)
+        self.doc_lengths.extend(doc_lengths)
+        self.alive.extend(np.ones(len(business_ids), dtype=np.bool_))
+        self.total_length += sum(doc_lengths)
+
+    # Returns ([(business_id, score)], total) for one page of results. Without a query the filtered
+    # businesses are returned in business_id order.
+    def search(self, query, filters=None, offset=0, limit=20):
+        terms = set(tokenize(query))
+        with self.lock:
+            count = self.alive.size
+            if count == 0:
+                return [], 0
+            mask = self.alive.view().copy()
+            for field, value in (filters or {}).items():
+                slots = self.filters.get((field, filter_value(value)))
+                if slots is None:
+                    return [], 0
+                field_mask = np.zeros(count, dtype=np.bool_)
+                field_mask[slots.view()] = True
+                mask &= field_mask
+
+            business_ids = self.business_ids.view()
+            if terms:
+                scores = np.zeros(count, dtype=np.float32)
+                doc_lengths = self.doc_lengths.view()
+                average_length = self.total_length / count
+                for term in terms:
+                    entry = self.postings.get(term)
+                    if entry is None:
+                        continue
+                    slots, frequencies = entry[0].view(), entry[1].view()
+                    idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+                    norms = K1 * (1 - B + B * doc_lengths[slots] / average_length)
+                    scores[slots] += idf * frequencies * (K1 + 1) / (frequencies + norms)
+                mask &= scores > 0
+            else:
+                scores = None
+
+            candidates = np.flatnonzero(mask)
+            total = len(candidates)
+            wanted = offset + limit
+            if total == 0 or offset >= total:
+                return [], total
+
+            # Only candidates that can reach the first offset + limit are sorted: everything up to the key in
+            # position offset + limit, including every tie with it, so ties always go to the lower business_id
+            keys = -scores[candidates] if scores is not None else business_ids[candidates]
+            if wanted < total:
+                within = keys <= np.partition(keys, wanted - 1)[wanted - 1]
+                candidates, keys = candidates[within], keys[within]
+            page = candidates[np.lexsort((business_ids[candidates], keys))][offset:wanted]
+            return [
+                (int(business_ids[slot]), float(scores[slot]) if scores is not None else None) for slot in page
+            ], total
+
+    def _remove(self, business_id):
+        slot = self.slots.pop(business_id, None)
+        if slot is not None:
+            self.alive.data[slot] = False
+            self.dead += 1
+
+    # Drops dead slots and renumbers the live ones in a single vectorized pass per posting list.
+    def _compact(self):
+        alive = self.alive.view()
+        renumbered = np.cumsum(alive, dtype=np.int64) - 1
+
+        postings = {}
+        for term, (slots, frequencies) in self.postings.items():
+            slot_values = slots.view()
+            keep = alive[slot_values]
+            if keep.any():
+                postings[term] = (Column(np.int32, renumbered[slot_values[keep]]),
+                                  Column(np.float32, frequencies.view()[keep]))
+        filters = {}
+        for key, slots in self.filters.items():
+            slot_values = slots.view()
+            keep = alive[slot_values]
+            if keep.any():
+                filters[key] = Column(np.int32, renumbered[slot_values[keep]])
+
+        business_ids = self.business_ids.view()[alive]
+        doc_lengths = self.doc_lengths.view()[alive]
+        self.postings, self.filters = postings, filters
+        self.business_ids = Column(np.int64, business_ids)
+        self.doc_lengths = Column(np.float32, doc_lengths)
+        self.alive = Column(np.bool_, np.ones(len(business_ids), dtype=np.bool_))
+        self.slots = {int(business_id): slot for slot, business_id in enumerate(business_ids)}
+        self.total_length = float(doc_lengths.sum())
+        self.dead = 0
+
+search_index = SearchIndex()
@@ -0,0 +1,114 @@
+import re
+
+# Declarative payload schemas. Each field rule may set:
+#   required  - the field must be present (and non-blank if it is a string)
+#   type      - 'string', 'boolean', 'integer', 'number' or 'object'
+#   pattern   - regex a string value must match, with `pattern_error` as the message
+#   schema    - nested schema for 'object' fields, with `error` as the message when it's missing or not a dict
+#               and `missing_error` as the template for the nested fields
+ADDRESS_SCHEMA = {
+    'line1': {'required': True, 'type': 'string'},
+    'line2': {'type': 'string'},
+    'city': {'required': True, 'type': 'string'},
+    'state': {'required': True, 'type': 'string'},
+    'zipcode': {'required': True, 'type': 'string', 'pattern': r'^\d{5}$', 'pattern_error': 'Invalid zipcode format.'},
+    'country': {'required': True, 'type': 'string'},
+}
+
+BUSINESS_SCHEMA = {
+    'business_name': {'required': True},
+    'organization_type': {'required': True},
+    'resources_available': {'required': True},
+    'has_available_resources': {'required': True, 'type': 'boolean'},
+    'contact_info': {'required': True, 'type': 'string', 'pattern': r'^\d{10,11}$',
+                     'pattern_error': 'Invalid phone number format. Expected 10 or 11 digits.'},
+    'yearly_revenue': {'required': True, 'type': 'integer'},
+    'employee_count': {'required': True, 'type': 'integer'},
+    'customer_satisfaction': {'required': True, 'type': 'number'},
+    'website_traffic': {'required': True, 'type': 'integer'},
+    'address': {'required': True, 'type': 'object', 'schema': ADDRESS_SCHEMA,
+                'error': 'Missing or invalid address field', 'missing_error': 'Missing or empty address field: {field}'},
+}
+
+TYPE_CHECKS = {
+    'string': (lambda value: isinstance(value, str), 'Invalid data type for field: {field}. Expected string.'),
+    'boolean': (lambda value: isinstance(value, bool), 'Invalid data type for field: {field}'),
+    # bool is a subclass of int, so it is excluded explicitly for the numeric types
+    'integer': (lambda value: isinstance(value, int) and not isinstance(value, bool),
+                'Invalid data type for field: {field}. Expected integer.'),
+    'number': (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+               'Invalid data type for field: {field}. Expected float or integer.'),
+}
+
+# Compiles a schema once into a flat list of field checks. Validation then runs straight through the list
+# and collects every error for a row instead of stopping at the first one. `partial` validators are used
+# for edits: only the fields present in the payload are checked.
+class Validator:
+    def __init__(self, schema, missing_error='Missing or empty required field: {field}', partial=False):
+        self.checks = [
+            self.compile_field(field, rule, missing_error, partial) for field, rule in schema.items()
+        ]
+
+    def validate(self, data):
+        errors = []
+        for check in self.checks:
+            check(data, errors)
+        return errors
+
+    # Returns one error list per row, in order.
+    def validate_many(self, rows):
+        checks = self.checks
+        results = []
+        for data in rows:
+            errors = []
+            for check in checks:
+                check(data, errors)
+            results.append(errors)
+        return results
+
+    @staticmethod
+    def compile_field(field, rule, missing_error, partial):
+        rule_required = rule.get('required', False)
+        required = rule_required and not partial
+        missing_message = missing_error.format(field=field)
+        type_check, type_message = TYPE_CHECKS.get(rule.get('type'), (None, None))
+        type_message = type_message.format(field=field) if type_message else None
+        pattern = re.compile(rule['pattern']) if 'pattern' in rule else None
+        pattern_message = rule.get('pattern_error', f'Invalid format for field: {field}')
+        nested = Validator(rule['schema'], missing_error=rule.get('missing_error', missing_error), partial=partial) \
+            if 'schema' in rule else None
+        object_message = rule.get('error', missing_message)
+
+        def check(data, errors):
+            if field not in data:
+                if required:
+                    errors.append(object_message if nested else missing_message)
+                return
+
+            value = data[field]
+            # An edit may clear an optional field (blank or null), but not a required one
+            if value is None and partial and not rule_required:
+                return
+            if isinstance(value, str) and not value.strip():
+                if rule_required:
+                    errors.append(object_message if nested else missing_message)
+                return
+            if nested is not None:
+                if not isinstance(value, dict):
+                    errors.append(object_message)
+                else:
+                    errors.extend(nested.validate(value))
+                return
+            if type_check is not None and not type_check(value):
+                errors.append(type_message)
+                return
+            if pattern is not None and not pattern.match(value):
+                errors.append(pattern_message)
+
+        return check
+
+business_validator = Validator(BUSINESS_SCHEMA)
+business_update_validator = Validator(BUSINESS_SCHEMA, partial=True)
+address_validator = Validator(ADDRESS_SCHEMA, missing_error='Missing or empty address field: {field}')
+address_update_validator = Validator(ADDRESS_SCHEMA)
+address_partial_validator = Validator(ADDRESS_SCHEMA, partial=True)
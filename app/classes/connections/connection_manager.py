@@ -0,0 +1,292 @@
+import os
+import time
+import threading
+import ibm_boto3
+from ibm_botocore.client import Config
+from pymongo import MongoClient, monitoring
+from pymongo.database import Database
+from redis import Redis, BlockingConnectionPool
+
+def server_name(address):
+    return f"{address[0]}:{address[1]}"
+
+# Connection pool statistics per MongoDB server, from pymongo's CMAP events. Check-out waits are timed on
+# the requesting thread, which is the thread the started and checked-out events fire on.
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.servers = {}
+
+    def server(self, address):
+        name = server_name(address)
+        if name not in self.servers:
+            self.servers[name] = {"open": 0, "checked_out": 0, "waiting": 0, "checkouts": 0, "failed_checkouts": 0,
+                                  "wait_ms_total": 0.0, "wait_ms_max": 0.0, "cleared": 0}
+        return self.servers[name]
+
+    def pool_created(self, event):
+        with self.lock:
+            self.server(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self.lock:
+            self.server(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self.lock:
+            self.server(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.server(event.address)["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        self.local.started = time.perf_counter()
+        with self.lock:
+            self.server(event.address)["waiting"] += 1
+
+    def connection_check_out_failed(self, event):
+        self.checked_out(event.address, failed=True)
+
+    def connection_checked_out(self, event):
+        self.checked_out(event.address, failed=False)
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.server(event.address)["checked_out"] -= 1
+
+    def checked_out(self, address, failed):
+        started = getattr(self.local, 'started', None)
+        wait_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        self.local.started = None
+        with self.lock:
+            server = self.server(address)
+            server["waiting"] = max(server["waiting"] - 1, 0)
+            if failed:
+                server["failed_checkouts"] += 1
+                return
+            server["checked_out"] += 1
+            server["checkouts"] += 1
+            server["wait_ms_total"] += wait_ms
+            server["wait_ms_max"] = max(server["wait_ms_max"], wait_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: dict(server, wait_ms_avg=server["wait_ms_total"] / server["checkouts"] if server["checkouts"] else 0.0)
+                for name, server in self.servers.items()
+            }
+
+# Count, failures and latency of every MongoDB command name.
+class MongoCommandStats(monitoring.CommandListener):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = {}
+
+    def record(self, event, failed):
+        duration_ms = event.duration_micros / 1000
+        with self.lock:
+            command = self.commands.setdefault(event.command_name, {"count": 0, "failed": 0, "ms_total": 0.0, "ms_max": 0.0})
+            command["count"] += 1
+            command["failed"] += 1 if failed else 0
+            command["ms_total"] += duration_ms
+            command["ms_max"] = max(command["ms_max"], duration_ms)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.record(event, failed=False)
+
+    def failed(self, event):
+        self.record(event, failed=True)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: dict(command, ms_avg=command["ms_total"] / command["count"] if command["count"] else 0.0)
+                for name, command in self.commands.items()
+            }
+
+# Redis pool that waits up to `timeout` for a free connection instead of failing, and keeps track of how
+# many connections are in use and how long callers waited (including connecting when the pool grows).
+class TimedConnectionPool(BlockingConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stats_lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self.stats_lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        return connection
+
+    def release(self, connection):
+        with self.stats_lock:
+            self.in_use -= 1
+        super().release(connection)
+
+    def snapshot(self):
+        with self.stats_lock:
+            return {"max_connections": self.max_connections, "in_use": self.in_use, "checkouts": self.checkouts,
+                    "wait_ms_total": self.wait_ms_total, "wait_ms_max": self.wait_ms_max,
+                    "wait_ms_avg": self.wait_ms_total / self.checkouts if self.checkouts else 0.0}
+
+# Creates the MongoDB, Redis and IBM COS clients on first use, once per process. None of them is safe to
+# share across a fork (a MongoClient's monitor threads and sockets in particular), so a process that finds
+# clients made by its parent drops them and builds its own; the parent's are left alone rather than closed,
+# since the parent is still using them. Pool sizes and timeouts come from the app config.
+class ConnectionManager:
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.pid = None
+        self.clients = {}
+        self.mongo_pool_stats = None
+        self.mongo_command_stats = None
+
+    def get(self, name, factory):
+        if self.pid == os.getpid():
+            client = self.clients.get(name)
+            if client is not None:
+                return client
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.clients = {}
+                self.mongo_pool_stats = MongoPoolStats()
+                self.mongo_command_stats = MongoCommandStats()
+            if name not in self.clients:
+                self.clients[name] = factory()
+            return self.clients[name]
+
+    def mongo(self):
+        return self.get('mongo', self.create_mongo)
+
+    def redis(self):
+        return self.get('redis', self.create_redis)
+
+    def cos(self):
+        return self.get('cos', self.create_cos)
+
+    def create_mongo(self):
+        return MongoClient(
+            self.config['MONGODB_URI'],
+            maxPoolSize=self.config['MONGO_MAX_POOL_SIZE'],
+            minPoolSize=self.config['MONGO_MIN_POOL_SIZE'],
+            waitQueueTimeoutMS=self.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+            connectTimeoutMS=self.config['MONGO_CONNECT_TIMEOUT_MS'],
+            serverSelectionTimeoutMS=self.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+            socketTimeoutMS=self.config['MONGO_SOCKET_TIMEOUT_MS'],
+            event_listeners=[self.mongo_pool_stats, self.mongo_command_stats]
+        )
+
+    def create_redis(self):
+        pool = TimedConnectionPool.from_url(
+            self.config['REDIS_URL'],
+            max_connections=self.config['REDIS_MAX_CONNECTIONS'],
+            timeout=self.config['REDIS_POOL_TIMEOUT'],
+            socket_timeout=self.config['REDIS_SOCKET_TIMEOUT'],
+            socket_connect_timeout=self.config['REDIS_CONNECT_TIMEOUT']
+        )
+        return Redis(connection_pool=pool)
+
+    def create_cos(self):
+        return ibm_boto3.resource('s3',
+            ibm_api_key_id=self.config['IBM_API_KEY'],
+            ibm_service_instance_id=self.config['IBM_SERVICE_INSTANCE_ID'],
+            ibm_auth_endpoint=self.config['IBM_AUTH_URL'],
+            config=Config(signature_version='oauth'),
+            endpoint_url=self.config['IBM_ENDPOINT_URL']
+        )
+
+    # Live statistics of this process's pools. Clients that haven't been used yet aren't created for it.
+    def stats(self):
+        with self.lock:
+            forked = self.pid != os.getpid()
+            clients = {} if forked else dict(self.clients)
+            pool_stats, command_stats = self.mongo_pool_stats, self.mongo_command_stats
+        stats = {"pid": os.getpid(), "mongo": None, "redis": None}
+        if 'mongo' in clients:
+            stats["mongo"] = {
+                "max_pool_size": self.config['MONGO_MAX_POOL_SIZE'],
+                "servers": pool_stats.snapshot(),
+                "commands": command_stats.snapshot()
+            }
+        pool = getattr(clients.get('redis'), 'connection_pool', None)
+        if isinstance(pool, TimedConnectionPool):
+            stats["redis"] = pool.snapshot()
+        return stats
+
+# Stands in for a client at import time; every attribute is looked up on the current process's client.
+class LazyClient:
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+# Database stand-in whose collections can be bound at module level (`businesses_collection = db.businesses`)
+# without connecting; each collection resolves against the current process's client when it is used.
+class LazyDatabase:
+    def __init__(self, manager, name):
+        self._manager = manager
+        self._name = name
+
+    def _resolve(self):
+        return self._manager.mongo().get_database(self._name)
+
+    def get_collection(self, name, **kwargs):
+        if kwargs:
+            return self._resolve().get_collection(name, **kwargs)
+        return LazyCollection(self, name)
+
+    def __getitem__(self, name):
+        return LazyCollection(self, name)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if hasattr(Database, name):
+            return getattr(self._resolve(), name)
+        return LazyCollection(self, name)
+
+class LazyCollection:
+    def __init__(self, database, name):
+        self._database = database
+        self._name = name
+        self._pid = None
+        self._collection = None
+
+    def _resolve(self):
+        if self._pid != os.getpid() or self._collection is None:
+            self._collection = self._database._resolve()[self._name]
+            self._pid = os.getpid()
+        return self._collection
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
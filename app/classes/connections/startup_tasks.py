@@ -0,0 +1,37 @@
+import os
+import logging
+import threading
+
+# Startup work that needs the database (index creation, warming the in-process business indexes). It runs
+# once per process in a background thread started by that process's first request, so with a preforking
+# server nothing connects in the master before it forks, and every worker warms its own copy. Requests don't
+# wait for it; anything that needs an index before it is warm builds it on demand.
+class StartupTasks:
+    def __init__(self):
+        self.tasks = []
+        self.lock = threading.Lock()
+        self.pid = None
+        self.thread = None
+
+    def register(self, description, task):
+        self.tasks.append((description, task))
+
+    def init_app(self, app):
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name="startup-tasks", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        for description, task in self.tasks:
+            try:
+                task()
+            except Exception as e:
+                logging.error(f"Failed to {description}: {e}")
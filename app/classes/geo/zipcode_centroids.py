@@ -0,0 +1,96 @@
+import logging
+import threading
+import numpy as np
+from pymongo import UpdateOne
+from app import app, db
+
+addresses_collection = db.addresses
+
+# Offline US zipcode -> centroid lookup. The table is three parallel numpy arrays (sorted 5-digit zipcodes
+# as uint32, latitudes and longitudes as float32, ~12 bytes per zipcode) read from an .npz file generated by
+# scripts/build_zipcode_centroids.py, and a lookup is a binary search. No geocoding service is ever called;
+# zipcodes that aren't in the table simply get no location.
+class ZipcodeCentroids:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.zipcodes = None
+        self.latitudes = None
+        self.longitudes = None
+        self.loaded = False
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            try:
+                with np.load(self.path) as table:
+                    self.zipcodes = table['zipcodes'].astype(np.uint32)
+                    self.latitudes = table['latitudes'].astype(np.float32)
+                    self.longitudes = table['longitudes'].astype(np.float32)
+                logging.info(f"Loaded {len(self.zipcodes)} zipcode centroids from {self.path}")
+            except (OSError, KeyError, ValueError) as e:
+                logging.error(f"Zipcode centroids unavailable, addresses won't be geocoded: {e}")
+            self.loaded = True
+
+    @property
+    def available(self):
+        self.load()
+        return self.zipcodes is not None and len(self.zipcodes) > 0
+
+    # Returns (latitude, longitude) for a zipcode (ZIP+4 is cut to its first five digits), or None.
+    def lookup(self, zipcode):
+        if not self.available or not isinstance(zipcode, str):
+            return None
+        digits = zipcode.strip()[:5]
+        if len(digits) != 5 or not digits.isdigit():
+            return None
+        key = int(digits)
+        index = int(np.searchsorted(self.zipcodes, key))
+        if index == len(self.zipcodes) or self.zipcodes[index] != key:
+            return None
+        return float(self.latitudes[index]), float(self.longitudes[index])
+
+    # GeoJSON point for a zipcode, in the [longitude, latitude] order 2dsphere indexes expect.
+    def point(self, zipcode):
+        centroid = self.lookup(zipcode)
+        if centroid is None:
+            return None
+        return {"type": "Point", "coordinates": [round(centroid[1], 5), round(centroid[0], 5)]}
+
+    # Sets `location` on a new address document when its zipcode is known.
+    def attach(self, address):
+        location = self.point(address.get('zipcode'))
+        if location is not None:
+            address['location'] = location
+        return address
+
+    # $set/$unset for an update that changes an address's zipcode.
+    def location_update(self, zipcode):
+        location = self.point(zipcode)
+        return ({"$set": {"location": location}} if location is not None else {"$unset": {"location": ""}})
+
+    # Recomputes `location` for the given addresses. Without address_ids it covers every address that has no
+    # location yet, or every address at all with only_missing=False. Returns how many addresses were updated.
+    def relocate(self, address_ids=None, only_missing=True, batch_size=1000):
+        if not self.available:
+            return 0
+        if address_ids is not None:
+            query = {"address_id": {"$in": list(address_ids)}}
+        else:
+            query = {"location": {"$exists": False}} if only_missing else {}
+        updated = 0
+        operations = []
+        for address in addresses_collection.find(query, {"_id": 0, "address_id": 1, "zipcode": 1}).batch_size(batch_size):
+            operations.append(UpdateOne({"address_id": address['address_id']},
+                                        self.location_update(address.get('zipcode'))))
+            if len(operations) >= batch_size:
+                updated += addresses_collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += addresses_collection.bulk_write(operations, ordered=False).modified_count
+        return updated
+
+zipcode_centroids = ZipcodeCentroids(app.config['ZIPCODE_CENTROIDS_PATH'])
+# Loaded up front so a missing or broken table is reported when the app starts, not on the first address
+zipcode_centroids.load()
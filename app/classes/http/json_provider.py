@@ -0,0 +1,46 @@
+from bson import ObjectId, Decimal128
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON provider for every jsonify/current_app.json call. ObjectId and Decimal128 values from MongoDB documents
+# are serialized natively, so handlers can return documents as they come out of the database instead of
+# converting ids by hand. orjson is used when it is installed, with the standard library as a fallback; dates
+# keep Flask's HTTP date format either way.
+class BSONJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, ObjectId):
+            return str(value)
+        if isinstance(value, Decimal128):
+            return str(value.to_decimal())
+        return DefaultJSONProvider.default(value)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dump_bytes(obj).decode('utf-8')
+
+    def dump_bytes(self, obj, option=0):
+        try:
+            return orjson.dumps(obj, default=self.default, option=option | orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and other values orjson rejects
+            return super().dumps(obj, separators=(',', ':')).encode('utf-8') + (
+                b'\n' if option & orjson.OPT_APPEND_NEWLINE else b'')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj, orjson.OPT_APPEND_NEWLINE), mimetype=self.mimetype)
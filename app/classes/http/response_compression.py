@@ -0,0 +1,123 @@
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request, current_app
+from redis.exceptions import RedisError
+from app import app, redis_client
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/pdf', 'application/x-ndjson', 'application/javascript',
+                          'text/html', 'text/plain', 'text/csv', 'text/css', 'image/svg+xml'}
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+VARIANT_KEY = "compressed:{encoding}:{etag}"
+VARIANT_TTL = 86400
+# Bigger variants are still served compressed, just not kept in Redis
+MAX_SHARED_VARIANT_SIZE = 4 * 1024 * 1024
+
+def compress(body, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(body, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    return gzip.compress(body, compresslevel=config['COMPRESSION_GZIP_LEVEL'], mtime=0)
+
+# The ETag of the `encoding` representation of a response whose identity ETag is `etag`.
+def encoded_etag(etag, encoding):
+    return f"{etag}-{encoding}"
+
+# Whether an If-None-Match header holds the ETag of any representation of the response.
+def etag_matches(if_none_match, etag):
+    if not if_none_match or not etag:
+        return False
+    return if_none_match.contains_weak(etag) or any(
+        if_none_match.contains_weak(encoded_etag(etag, encoding)) for encoding in ENCODINGS)
+
+# Compresses eligible responses with the best encoding the client accepts (Brotli, then gzip). Responses
+# that carry an ETag have a fixed body per ETag, so their compressed variants are cached by ETag: in a small
+# per-process LRU and, shared between workers, in Redis next to the cached bodies. A hot response is
+# therefore compressed once, not once per request. Streamed responses (exports, NDJSON pages) are left
+# alone since they are produced chunk by chunk.
+class ResponseCompressor:
+    def __init__(self, cache_size):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (encoding, etag) -> compressed bytes
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        etag, _ = response.get_etag()
+        if response.status_code == 304:
+            # Echo back whichever representation's ETag the client holds
+            for encoding in ENCODINGS:
+                if etag and request.if_none_match.contains_weak(encoded_etag(etag, encoding)):
+                    response.set_etag(encoded_etag(etag, encoding))
+                    break
+            return response
+
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+            return response
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None or (response.content_length or 0) < current_app.config['COMPRESSION_MIN_SIZE']:
+            return response
+
+        body = self.variant(encoding, etag) if etag else None
+        if body is None:
+            body = compress(response.get_data(), encoding, current_app.config)
+            if etag:
+                self.store(encoding, etag, body)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(encoded_etag(etag, encoding))
+        return response
+
+    def variant(self, encoding, etag):
+        key = (encoding, etag)
+        with self.lock:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache.move_to_end(key)
+                return body
+        try:
+            body = redis_client.get(VARIANT_KEY.format(encoding=encoding, etag=etag))
+        except RedisError as e:
+            current_app.logger.warning(f"Compressed variant cache unavailable: {e}")
+            return None
+        if body is not None:
+            self.remember(key, body)
+        return body
+
+    def store(self, encoding, etag, body):
+        self.remember((encoding, etag), body)
+        if len(body) > MAX_SHARED_VARIANT_SIZE:
+            return
+        try:
+            redis_client.set(VARIANT_KEY.format(encoding=encoding, etag=etag), body, ex=VARIANT_TTL)
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to store compressed variant: {e}")
+
+    def remember(self, key, body):
+        if len(body) > self.cache_size:
+            return
+        with self.lock:
+            previous = self.cache.pop(key, None)
+            if previous is not None:
+                self.cached_bytes -= len(previous)
+            self.cache[key] = body
+            self.cached_bytes += len(body)
+            while self.cached_bytes > self.cache_size:
+                _, evicted = self.cache.popitem(last=False)
+                self.cached_bytes -= len(evicted)
+
+response_compressor = ResponseCompressor(app.config['COMPRESSION_CACHE_SIZE'])
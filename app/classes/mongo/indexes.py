@@ -0,0 +1,104 @@
+import logging
+from bson import ObjectId
+from pymongo import ASCENDING, GEOSPHERE
+from pymongo.errors import OperationFailure
+from app import db
+
+# Every index the application relies on, as (collection, keys, options). create_index is a no-op when an
+# identical index already exists, so applying the registry is idempotent.
+INDEXES = [
+    ("businesses", [("business_id", ASCENDING)], {}),
+    ("businesses", [("business_name", ASCENDING)], {}),
+    ("business_details", [("business_name", ASCENDING)], {}),
+    ("addresses", [("address_id", ASCENDING)], {}),
+    # GeoJSON zipcode centroids behind /api/businesses/nearby; addresses without one are left out of the index
+    ("addresses", [("location", GEOSPHERE)], {}),
+    ("business_changes", [("seq", ASCENDING)], {}),
+    ("business_changes", [("op", ASCENDING), ("seq", ASCENDING)], {}),
+    ("linker", [("business_id", ASCENDING), ("address_id", ASCENDING)], {}),
+    ("linker", [("address_id", ASCENDING)], {}),
+    ("threads", [("thread_id", ASCENDING)], {}),
+    ("threads", [("user_id", ASCENDING)], {}),
+    ("accounts", [("username", ASCENDING)], {}),
+    ("google_accounts", [("google_id", ASCENDING)], {}),
+    ("google_accounts", [("access_token", ASCENDING)], {}),
+    ("google_accounts", [("user_id", ASCENDING)], {}),
+    ("google_accounts", [("refresh_token", ASCENDING)], {}),
+    ("google_accounts", [("account_name", ASCENDING)], {}),
+    ("refresh_tokens", [("token", ASCENDING)], {}),
+    ("refresh_tokens", [("userId", ASCENDING)], {}),
+    # Refresh tokens are removed by MongoDB as soon as their expiresAt passes
+    ("refresh_tokens", [("expiresAt", ASCENDING)], {"expireAfterSeconds": 0}),
+]
+
+# The query shapes issued by DataHandler, BusinessDetails, NativeAuth, GoogleAuth, is_user_admin and the
+# AI socket events. Values are placeholders; only the shape matters to the planner.
+QUERY_SHAPES = [
+    ("DataHandler.get_businesses (page)", "businesses", {"business_id": {"$type": "number", "$gt": 0}}, [("business_id", ASCENDING)]),
+    ("DataHandler.get_business_info (fallback)", "businesses", {"business_name": ""}, None),
+    ("DataHandler.edit_business_info", "businesses", {"business_id": 0}, None),
+    ("DataHandler.delete_business_address", "linker", {"address_id": 0}, None),
+    ("DataHandler.edit_business_address", "addresses", {"address_id": 0}, None),
+    ("BusinessChangeLog.changes", "business_changes", {"seq": {"$gt": 0}}, [("seq", ASCENDING)]),
+    ("BusinessDetails.load", "business_details", {"business_name": ""}, None),
+    ("BusinessDetails.refresh (businesses)", "businesses", {"business_id": {"$in": [0]}}, None),
+    ("BusinessDetails.refresh (linker)", "linker", {"business_id": {"$in": [0]}}, None),
+    ("BusinessDetails.refresh (addresses)", "addresses", {"address_id": {"$in": [0]}}, None),
+    ("is_user_admin (accounts)", "accounts", {"$or": [{"username": ""}, {"_id": ObjectId()}]}, None),
+    ("is_user_admin (google_accounts)", "google_accounts",
+     {"$or": [{"access_token": ""}, {"user_id": ""}, {"_id": ObjectId()}]}, None),
+    ("NativeAuth.create_account", "accounts", {"username": ""}, None),
+    ("NativeAuth.update_account", "google_accounts", {"account_name": ""}, None),
+    ("NativeAuth.protected", "google_accounts", {"access_token": ""}, None),
+    ("NativeAuth.token_login", "refresh_tokens", {"userId": ""}, None),
+    ("NativeAuth.refresh_token", "refresh_tokens", {"token": ""}, None),
+    ("GoogleAuth.callback", "google_accounts", {"google_id": ""}, None),
+    ("GoogleAuth.refresh_token", "google_accounts", {"refresh_token": ""}, None),
+    ("ai_socket_events.get_user_threads", "threads", {"user_id": ""}, None),
+    ("ai_socket_events.create_or_add_to_thread", "threads", {"thread_id": ""}, None),
+]
+
+class IndexRegistry:
+    def __init__(self):
+        pass
+
+    # Creates every registered index. A conflicting definition is logged rather than raised so that one bad
+    # index can't keep the app from starting.
+    @staticmethod
+    def ensure_indexes():
+        created = []
+        for collection_name, keys, options in INDEXES:
+            try:
+                created.append(db[collection_name].create_index(keys, **options))
+            except OperationFailure as e:
+                logging.error(f"Failed to create index {keys} on {collection_name}: {e}")
+        logging.info(f"Ensured {len(created)} of {len(INDEXES)} indexes")
+        return created
+
+    # Runs explain() on every registered query shape and reports the stages of each winning plan.
+    @staticmethod
+    def explain_report():
+        report = []
+        for name, collection_name, query, sort in QUERY_SHAPES:
+            cursor = db[collection_name].find(query).limit(1)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+            stages = IndexRegistry.plan_stages(plan)
+            report.append({
+                "query": name,
+                "collection": collection_name,
+                "stages": stages,
+                "collscan": "COLLSCAN" in stages
+            })
+        return report
+
+    @staticmethod
+    def plan_stages(plan):
+        stages = [plan['stage']] if 'stage' in plan else []
+        for child_key in ('inputStage', 'queryPlan'):
+            if child_key in plan:
+                stages.extend(IndexRegistry.plan_stages(plan[child_key]))
+        for child in plan.get('inputStages', []):
+            stages.extend(IndexRegistry.plan_stages(child))
+        return stages
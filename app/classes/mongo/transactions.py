@@ -0,0 +1,49 @@
+import logging
+from pymongo.errors import OperationFailure, CollectionInvalid
+from app import client, db
+
+# IllegalOperation: the deployment can't run multi-document transactions at all (standalone mongod)
+TRANSACTIONS_UNSUPPORTED_CODE = 20
+# OperationNotSupportedInTransaction: this operation can't run in one, e.g. creating a collection on a server
+# older than 4.4. Only the call fails; transactions stay on.
+NOT_SUPPORTED_IN_TRANSACTION_CODE = 263
+# Collections written inside transactions, created up front when the server won't create them in one
+TRANSACTION_COLLECTIONS = ['businesses', 'addresses', 'linker', 'business_rollups']
+
+class Transactions:
+    supported = True
+
+    def __init__(self):
+        pass
+
+    # Runs callback(session) inside a transaction, retrying transient errors through with_transaction.
+    # On a deployment without transaction support the callback runs once with session=None instead.
+    @staticmethod
+    def run(callback):
+        if Transactions.supported:
+            try:
+                return Transactions.run_in_session(callback)
+            except OperationFailure as e:
+                if e.code == NOT_SUPPORTED_IN_TRANSACTION_CODE and Transactions.create_collections():
+                    return Transactions.run_in_session(callback)
+                if e.code != TRANSACTIONS_UNSUPPORTED_CODE:
+                    raise
+                logging.warning(f"MongoDB transactions are not supported by this deployment, writing without one: {e}")
+                Transactions.supported = False
+        return callback(None)
+
+    @staticmethod
+    def run_in_session(callback):
+        with client.start_session() as session:
+            return session.with_transaction(callback)
+
+    # Creates the transactional collections that don't exist yet. Returns whether any were created.
+    @staticmethod
+    def create_collections():
+        missing = set(TRANSACTION_COLLECTIONS) - set(db.list_collection_names())
+        for name in missing:
+            try:
+                db.create_collection(name)
+            except CollectionInvalid:
+                pass
+        return bool(missing)
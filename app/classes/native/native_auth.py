@@ -21,6 +21,7 @@ from flask import jsonify
 
 from app import client, db
 from ...models.account import Account
+from ...routes.util_routes import forget_admin_status
 from app import redis_client, limiter
 
 accounts_collection = db.accounts
@@ -67,12 +68,15 @@ class NativeAuth:
             updates['password_hash'] = new_pw
 
         accounts_collection.update_one({'username': username}, {'$set': updates})
+        if new_username:
+            forget_admin_status(username, new_username)
         return jsonify({'message': 'Account updated successfully'}), 200
     
     def delete_account(username):
         if google_accounts_collection.find_one({'account_name': username}):
             return jsonify({'message': 'Deletion not allowed for users logged in with Google'}), 403
         accounts_collection.delete_one({'username': username})
+        forget_admin_status(username)
         return jsonify({'message': 'Account deleted successfully'}), 200
     
     def reset_password(username, new_password):
@@ -98,8 +102,7 @@ class NativeAuth:
         try:
             account = accounts_collection.find_one({'username': current_user})
             if account:
-                user_id = str(account['_id'])
-                return jsonify(logged_in_as=current_user, id=user_id), 200
+                return jsonify(logged_in_as=current_user, id=account['_id']), 200
             else:
                 current_app.logger.info(f"[Protected Endpoint] - Native account not found for username: {current_user}. Trying with OAuth...")
 
@@ -107,7 +110,6 @@ class NativeAuth:
                 if oauth_token:
                     user_document = google_accounts_collection.find_one({"access_token": oauth_token})
                     if user_document:
-                        user_id = str(user_document['_id'])
                         return jsonify(logged_in_as=user_document['account_name']), 200
                     else:
                         current_app.logger.error("OAuth account not found")
@@ -175,7 +177,7 @@ class NativeAuth:
 
             response_data = {
                 'message': 'Login successful',
-                'user': {'_id': str(account['_id']), 'username': account['username']},
+                'user': {'_id': account['_id'], 'username': account['username']},
                 'csrf_tokens': {
                     'access_csrf': access_csrf,
                     'refresh_csrf': refresh_csrf
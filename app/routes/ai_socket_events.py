@@ -11,7 +11,7 @@ import json
 import requests
 import re
 from app import db, redis_client
-from .util_routes import is_user_admin
+from .util_routes import is_user_admin_cached
 client = OpenAI()
 ai_routes_bp = Blueprint('ai_routes', __name__)
 
@@ -497,17 +497,7 @@ def auto_add_multiple_businesses(businesses_data, user_id):
 # Checks admin status for authentication to add multiple businesses via a Redis memory cache server
 def check_admin_status(user_id):
     current_app.logger.info(f"received user_id for admin status checking: {user_id}")
-    cache_key = f"admin_status:{user_id}"
-    is_admin_bytes = redis_client.get(cache_key)
-
-    if is_admin_bytes is None:
-        is_admin = is_user_admin(user_id, accounts_collection, google_accounts_collection)
-        current_app.logger.info(f"{user_id} admin's status is.... {is_admin}")
-        redis_client.setex(cache_key, 3600, 'True' if is_admin else 'False')
-    else:
-        is_admin_str = is_admin_bytes.decode('utf-8')
-        is_admin = is_admin_str == 'True'
-    
+    is_admin = is_user_admin_cached(user_id)
     current_app.logger.info(f"{user_id} admin status in check_admin_status: {is_admin}")
     return is_admin
 # Submits tool output and broadcasts to user whether there was a success or not.
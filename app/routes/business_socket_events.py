@@ -0,0 +1,42 @@
+from flask import request
+from flask_socketio import join_room, leave_room, rooms
+from ..classes.business.change_publisher import BUSINESS_NAMESPACE, LIST_ROOM, business_room
+
+MAX_SUBSCRIPTIONS = 200
+
+def requested_rooms(data):
+    if not isinstance(data, dict):
+        return None
+    business_ids = data.get('business_ids', [])
+    if not isinstance(business_ids, list) or not all(
+            isinstance(business_id, int) and not isinstance(business_id, bool) for business_id in business_ids):
+        return None
+    return ([LIST_ROOM] if data.get('list') else []) + [business_room(business_id) for business_id in business_ids]
+
+def subscribed_rooms():
+    return sorted(room for room in rooms(namespace=BUSINESS_NAMESPACE) if room != request.sid)
+
+# Live business updates, see BusinessChangePublisher. Clients emit 'subscribe' or 'unsubscribe' on the
+# /businesses namespace with {"list": true} and/or {"business_ids": [...]}; the acknowledgement lists the
+# rooms the client is in afterwards.
+def setup_business_socket_events(socketio):
+    @socketio.on('subscribe', namespace=BUSINESS_NAMESPACE)
+    def handle_subscribe(data):
+        requested = requested_rooms(data)
+        if requested is None:
+            return {'error': "Expected {'list': bool, 'business_ids': [int, ...]}"}
+        current = set(rooms(namespace=BUSINESS_NAMESPACE))
+        if len(current | set(requested)) > MAX_SUBSCRIPTIONS:
+            return {'error': f'At most {MAX_SUBSCRIPTIONS} subscriptions per connection'}
+        for room in requested:
+            join_room(room, namespace=BUSINESS_NAMESPACE)
+        return {'rooms': subscribed_rooms()}
+
+    @socketio.on('unsubscribe', namespace=BUSINESS_NAMESPACE)
+    def handle_unsubscribe(data):
+        requested = requested_rooms(data)
+        if requested is None:
+            return {'error': "Expected {'list': bool, 'business_ids': [int, ...]}"}
+        for room in requested:
+            leave_room(room, namespace=BUSINESS_NAMESPACE)
+        return {'rooms': subscribed_rooms()}
@@ -1,10 +1,14 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, stream_with_context
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from flask import jsonify
 
-from app import db
-from .util_routes import is_user_admin
+from app import db, socketio
+from .util_routes import is_user_admin, is_user_admin_cached, require_admin
 from ..classes.business.data_handling import DataHandler
+from ..classes.business.bulk_import import BulkImporter
+from ..classes.business.bulk_export import BulkExporter
+from ..classes.business.search_index import FILTER_FIELDS as SEARCH_FILTER_FIELDS
+from ..classes.business.analytics_snapshot import METRIC_FIELDS
 
 businesses_collection = db.businesses
 counters_collection = db.counters
@@ -13,9 +17,95 @@ google_accounts_collection = db.google_accounts
 
 data_routes_bp = Blueprint('data_routes', __name__)
 
+# Paging with ?after=<business_id> may miss businesses added meanwhile, see DataHandler.stream_businesses
 @data_routes_bp.route('/api/businesses', methods=['GET'])
 def get_businesses():
-    return DataHandler.get_businesses()
+    # Without any paging options the whole list is served from the cache
+    if not any(arg in request.args for arg in ('after', 'limit', 'fields', 'format')):
+        return DataHandler.get_businesses(request.if_none_match)
+
+    try:
+        after = int(request.args['after']) if 'after' in request.args else None
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    output_format = request.args.get('format', 'json')
+
+    return DataHandler.stream_businesses(after, limit, fields, output_format)
+
+# Delta sync for clients holding a copy of /api/businesses: pass the `next` of the previous response as ?since=
+@data_routes_bp.route('/api/businesses/changes', methods=['GET'])
+def get_business_changes():
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', 1000))
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+
+    return DataHandler.get_business_changes(since, limit)
+
+@data_routes_bp.route('/api/search', methods=['GET'])
+def search_businesses():
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    filters = {field: request.args[field] for field in SEARCH_FILTER_FIELDS if request.args.get(field)}
+
+    return DataHandler.search_businesses(request.args.get('q', ''), filters, offset, limit)
+
+@data_routes_bp.route('/api/rollups', methods=['GET'])
+def get_rollups():
+    error = require_admin()
+    if error:
+        return error
+    return DataHandler.get_rollups(request.args.get('dimension', 'organization_type'))
+
+# Admin cohort statistics, e.g.
+#   /api/analytics?organization_type=Nonprofit&min_employee_count=10&group_by=organization_type&histogram=yearly_revenue
+@data_routes_bp.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    error = require_admin()
+    if error:
+        return error
+
+    def split(name):
+        return [value.strip() for value in request.args[name].split(',') if value.strip()] if name in request.args else None
+
+    try:
+        ranges = {}
+        for field in METRIC_FIELDS:
+            low, high = request.args.get(f'min_{field}'), request.args.get(f'max_{field}')
+            if low is not None or high is not None:
+                ranges[field] = (float(low) if low is not None else None, float(high) if high is not None else None)
+        percentiles = [float(value) for value in split('percentiles')] if 'percentiles' in request.args else None
+        bins = int(request.args.get('bins', 20))
+    except ValueError:
+        return jsonify({"error": "Range bounds and percentiles must be numbers and bins an integer"}), 400
+
+    return DataHandler.get_analytics(
+        organization_types=request.args.getlist('organization_type') or None,
+        ranges=ranges,
+        group_by=request.args.get('group_by'),
+        metrics=split('metrics'),
+        percentiles=percentiles,
+        histogram=request.args.get('histogram'),
+        bins=bins
+    )
+
+@data_routes_bp.route('/api/businesses/nearby', methods=['GET'])
+def nearby_businesses():
+    try:
+        latitude = float(request.args['lat']) if 'lat' in request.args else None
+        longitude = float(request.args['lon']) if 'lon' in request.args else None
+        k = int(request.args.get('k', 10))
+        max_distance_km = float(request.args['max_distance_km']) if 'max_distance_km' in request.args else None
+    except ValueError:
+        return jsonify({"error": "lat, lon and max_distance_km must be numbers and k an integer"}), 400
+
+    return DataHandler.nearby_businesses(latitude, longitude, request.args.get('zipcode'), k, max_distance_km)
 
 @data_routes_bp.route('/api/business_info', methods=['GET'])
 def get_business_info():
@@ -35,12 +125,12 @@ def get_business_info():
             current_app.logger.error("User not authenticated")
             return jsonify({"error": "User not authenticated"}), 401
 
-    # Check if the user is an admin
-    is_admin = is_user_admin(current_user, accounts_collection, google_accounts_collection)
+    # Check if the user is an admin; cached so a conditional request doesn't reach MongoDB
+    is_admin = is_user_admin_cached(current_user)
     current_app.logger.info(f"admin status for business info check: {is_admin}")
 
     business_name = request.args.get('name')
-    return DataHandler.get_business_info(business_name, is_admin)
+    return DataHandler.get_business_info(business_name, is_admin, request.if_none_match)
 
 
 @data_routes_bp.route('/add_business', methods=['POST'])
@@ -69,10 +159,93 @@ def add_business():
         return DataHandler.add_business(data)
     except Exception as exception:
         return jsonify({"error": "One or more fields is missing. Please fill out the form fields before submitting again."}), 400
+
+# Admin bulk creation of businesses; responds with a per-row report
+@data_routes_bp.route('/add_businesses', methods=['POST'])
+def add_businesses():
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    data = request.json or {}
+    businesses_data = data.get('businesses')
+    if not isinstance(businesses_data, list):
+        return jsonify({"error": "'businesses' should be a list of business data objects."}), 400
+
+    chunk_size = data.get('chunk_size')
+    if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size <= 0):
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+
+    return DataHandler.add_multiple_businesses(businesses_data, chunk_size=chunk_size,
+                                               transactional=bool(data.get('transactional', False)))
+
+# Admin import of a CSV or NDJSON upload. The request body is read incrementally and written in chunks;
+# pass the Socket.IO session id as ?sid= to receive 'import-progress' events while it runs.
+@data_routes_bp.route('/import_businesses', methods=['POST'])
+def import_businesses():
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    import_format = request.args.get('format')
+    if not import_format:
+        import_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    try:
+        chunk_size = int(request.args.get('chunk_size', current_app.config['BULK_CHUNK_SIZE']))
+    except ValueError:
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+    if chunk_size <= 0:
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+
+    transactional = request.args.get('transactional', 'false').lower() == 'true'
+    sid = request.args.get('sid')
+
+    def report_progress(report):
+        if sid:
+            socketio.emit('import-progress', {key: report[key] for key in ('processed', 'inserted', 'invalid', 'failed')}, to=sid)
+
+    parser = BulkImporter.parse_csv if import_format == 'csv' else BulkImporter.parse_ndjson
+    return DataHandler.import_businesses(parser(request.stream), chunk_size, transactional, report_progress)
+
+# Admin export of every business joined with its addresses as CSV or NDJSON, optionally gzipped on the fly
+@data_routes_bp.route('/export_businesses', methods=['GET'])
+def export_businesses():
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    compress = request.args.get('gzip', 'false').lower() == 'true'
+
+    filename = f"businesses.{export_format}" + (".gz" if compress else "")
+    mimetype = 'application/gzip' if compress else ('text/csv' if export_format == 'csv' else 'application/x-ndjson')
+    response = current_app.response_class(stream_with_context(BulkExporter.export(export_format, compress)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
 @data_routes_bp.route('/delete_business/<int:business_id>', methods=['DELETE'])
 def delete_business_by_id(business_id):
     return DataHandler.delete_business_by_id(business_id)
     
+# Admin bulk delete; each business is removed along with its addresses and links
+@data_routes_bp.route('/delete_businesses', methods=['POST'])
+def delete_businesses():
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    business_ids = (request.json or {}).get('business_ids')
+    if not isinstance(business_ids, list) or not all(
+            isinstance(business_id, int) and not isinstance(business_id, bool) for business_id in business_ids):
+        return jsonify({"error": "'business_ids' should be a list of integer business IDs."}), 400
+
+    return DataHandler.delete_businesses(business_ids)
+
 @data_routes_bp.route('/autocomplete', methods=['GET'])
 def autocomplete():
     query = request.args.get('query')
@@ -109,6 +282,21 @@ def edit_business_info():
 
     return DataHandler.edit_business_info(business_id, business_info)
 
+# Admin batch edit: {"businesses": [{business_id, changes}], "addresses": [{address_id, changes}]}
+@data_routes_bp.route('/bulk_edit', methods=['PATCH'])
+def bulk_edit():
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    data = request.json or {}
+    business_edits = data.get('businesses', [])
+    address_edits = data.get('addresses', [])
+    if not isinstance(business_edits, list) or not isinstance(address_edits, list):
+        return jsonify({"error": "'businesses' and 'addresses' should be lists of edits."}), 400
+
+    return DataHandler.bulk_edit(business_edits, address_edits)
+
 @data_routes_bp.route('/add_address/<int:business_id>', methods=['POST'])
 def add_address(business_id):
     try:
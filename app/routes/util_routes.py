@@ -1,14 +1,19 @@
 from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 import logging
+import hashlib
 from bson import ObjectId
+from redis.exceptions import RedisError
 
 util_routes_bp = Blueprint("util_routes", __name__)
-from app import db
+from app import db, redis_client, connection_manager
 
 accounts_collection = db.accounts
 google_accounts_collection = db.google_accounts
 
+# isAdmin is set directly in MongoDB, so a change made there takes at most this long to apply
+ADMIN_STATUS_TTL = 60
+
 @util_routes_bp.route('/admin_status_check', methods=['GET'])
 def admin_status_check():
     try:
@@ -40,6 +45,67 @@ def admin_status_check():
     logging.error("User not authenticated")
     return jsonify({"error": "User not authenticated"}), 401
 
+# Live MongoDB and Redis pool statistics of the worker that answers, for sizing MONGO_MAX_POOL_SIZE and
+# REDIS_MAX_CONNECTIONS under load.
+@util_routes_bp.route('/api/stats/connections', methods=['GET'])
+def connection_stats():
+    error = require_admin()
+    if error:
+        return error
+    return jsonify(connection_manager.stats()), 200
+
+# Resolves the caller from a JWT, falling back to the OAuth access token cookie. Returns None when neither is present.
+def get_current_user():
+    try:
+        verify_jwt_in_request()
+        return get_jwt_identity()
+    except Exception as jwt_error:
+        current_app.logger.warning(f"JWT authentication failed: {jwt_error}")
+
+    oauth_token = request.cookies.get('access_token_cookie')
+    if not oauth_token:
+        current_app.logger.error("User not authenticated")
+    return oauth_token
+
+# Returns an error response for callers that aren't admins, or None when the request may proceed.
+def require_admin():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({"error": "User not authenticated"}), 401
+    if not is_user_admin_cached(current_user):
+        return jsonify({"error": "Unauthorized access"}), 403
+    return None
+
+# is_user_admin behind a short-lived Redis cache, so admin routes don't repeat the MongoDB lookups on every
+# request. Keys hold a hash of the identifier, which may be an OAuth access token. Without Redis the lookup
+# goes straight to MongoDB.
+def admin_status_key(identifier):
+    return f"admin_status:{hashlib.sha256(str(identifier).encode('utf-8')).hexdigest()}"
+
+def is_user_admin_cached(identifier):
+    cache_key = admin_status_key(identifier)
+    try:
+        is_admin_bytes = redis_client.get(cache_key)
+    except RedisError as e:
+        current_app.logger.warning(f"Admin status cache unavailable: {e}")
+        return is_user_admin(identifier, accounts_collection, google_accounts_collection) is True
+
+    if is_admin_bytes is None:
+        is_admin = is_user_admin(identifier, accounts_collection, google_accounts_collection) is True
+        try:
+            redis_client.setex(cache_key, ADMIN_STATUS_TTL, 'True' if is_admin else 'False')
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to cache admin status: {e}")
+        return is_admin
+    return is_admin_bytes.decode('utf-8') == 'True'
+
+# Drops the cached admin status of an identifier that now refers to a different account, or none.
+def forget_admin_status(*identifiers):
+    try:
+        redis_client.delete(*[admin_status_key(identifier) for identifier in identifiers])
+    except RedisError as e:
+        current_app.logger.warning(f"Failed to clear cached admin status: {e}")
+
 def is_user_admin(identifier, accounts_collection, google_accounts_collection):
     current_app.logger.info(f"Checking admin status for identifier: {identifier}")
 
@@ -0,0 +1,67 @@
+import os
+import gzip
+import json
+import time
+import argparse
+from standalone import load_backup, business_details, business_listing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def encode(payload):
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+# Bodies shaped like the ones the routes send, built from the backups in data/ so no database is needed
+def route_payloads(scale):
+    details = business_details()
+    return [
+        ("/api/businesses", encode(business_listing(details))),
+        ("/api/business_info", encode(details[0])),
+        ("/get-user-threads", encode(load_backup('threads'))),
+        (f"/api/businesses x{scale}", encode(business_listing(details, copies=scale))),
+    ]
+
+def codecs():
+    for level in (1, 6, 9):
+        yield f"gzip-{level}", lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0)
+    if brotli is not None:
+        for quality in (1, 5, 11):
+            yield f"br-{quality}", lambda body, quality=quality: brotli.compress(body, quality=quality)
+
+def best_time(compress, body, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressed = compress(body)
+        best = min(best, time.perf_counter() - started)
+    return compressed, best
+
+# Bytes saved versus compression time per route and encoding, to pick COMPRESSION_MIN_SIZE,
+# COMPRESSION_GZIP_LEVEL and COMPRESSION_BROTLI_QUALITY, e.g.
+#   python scripts/benchmark_compression.py --scale 200 --pdf report.pdf
+def main():
+    parser = argparse.ArgumentParser(description="Bytes saved and CPU time of response compression per route")
+    parser.add_argument('--scale', type=int, default=100, help="copies of the business list in the scaled payload")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pdf', action='append', default=[], help="PDF from /print_business_info to include")
+    args = parser.parse_args()
+
+    payloads = route_payloads(args.scale)
+    for path in args.pdf:
+        with open(path, 'rb') as pdf:
+            payloads.append((f"/print_business_info ({os.path.basename(path)})", pdf.read()))
+    if brotli is None:
+        print("Brotli isn't installed, only gzip is measured")
+
+    for route, body in payloads:
+        print(f"{route}: {len(body):,} bytes")
+        for name, compress in codecs():
+            compressed, seconds = best_time(compress, body, args.repeat)
+            saved = 1 - len(compressed) / len(body)
+            print(f"  {name:<8} {len(compressed):>12,} bytes  {saved:>6.1%} saved  {seconds * 1000:>9.3f} ms"
+                  f"  {len(body) / seconds / 1e6:>8.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
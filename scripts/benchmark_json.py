@@ -0,0 +1,59 @@
+import time
+import argparse
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from standalone import load_module, business_details, business_listing
+
+json_provider = load_module('json_provider', 'app', 'classes', 'http', 'json_provider.py')
+
+# Payloads shaped like /api/businesses and /api/business_info responses, as documents straight from MongoDB
+def route_payloads(scale):
+    details = business_details(object_ids=True)
+    listing = business_listing(details, copies=scale)
+    return [("/api/businesses", listing), ("/api/business_info", details[0]), ("/api/business_info x all", details)]
+
+# What handlers did before the BSON-aware provider: copy the documents to turn ObjectIds into strings
+def stringify_ids(payload):
+    if isinstance(payload, list):
+        return [stringify_ids(item) for item in payload]
+    if isinstance(payload, dict):
+        return {key: str(value) if isinstance(value, ObjectId) else stringify_ids(value)
+                for key, value in payload.items()}
+    return payload
+
+def calls_per_second(serialize, payload, repeat, number):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            serialize(payload)
+        best = min(best, time.perf_counter() - started)
+    return number / best
+
+# Compares response serialization with Flask's default provider against the BSON-aware one, e.g.
+#   python scripts/benchmark_json.py --scale 100
+def main():
+    parser = argparse.ArgumentParser(description="Serialization throughput of the JSON providers per route")
+    parser.add_argument('--scale', type=int, default=20, help="copies of the business list in /api/businesses")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    bson_aware = json_provider.BSONJSONProvider(app)
+    if json_provider.orjson is None:
+        print("orjson isn't installed, the BSON-aware provider uses the standard library")
+
+    with app.app_context():
+        for route, payload in route_payloads(args.scale):
+            before = calls_per_second(lambda body: default.response(stringify_ids(body)), payload,
+                                      args.repeat, args.number)
+            after = calls_per_second(bson_aware.response, payload, args.repeat, args.number)
+            size = len(bson_aware.response(payload).get_data())
+            print(f"{route:<26} {size:>10,} bytes   default: {before:>10,.0f}/s   "
+                  f"bson-aware: {after:>10,.0f}/s   {after / before:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
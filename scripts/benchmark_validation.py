@@ -0,0 +1,49 @@
+import time
+import argparse
+from standalone import load_module
+
+validation = load_module('validation', 'app', 'classes', 'business', 'validation.py')
+
+VALID_ROW = {
+    "business_name": "Riverside Food Bank",
+    "organization_type": "Nonprofit",
+    "resources_available": "Food pantry, volunteers",
+    "has_available_resources": True,
+    "contact_info": "5551234567",
+    "yearly_revenue": 250000,
+    "employee_count": 12,
+    "customer_satisfaction": 4.6,
+    "website_traffic": 3400,
+    "address": {"line1": "12 River Rd", "line2": "", "city": "Springfield", "state": "IL",
+                "zipcode": "62701", "country": "US"}
+}
+
+# Fails several rules at once so the all-errors path is measured too
+INVALID_ROW = dict(VALID_ROW, business_name=" ", contact_info="555-1234", yearly_revenue="lots",
+                   has_available_resources="yes", address=dict(VALID_ROW['address'], zipcode="627"))
+
+def rows_per_second(validate, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        validate(rows)
+        best = min(best, time.perf_counter() - started)
+    return len(rows) / best
+
+# Micro-benchmark for the business payload validator, e.g.
+#   python scripts/benchmark_validation.py --rows 100000
+def main():
+    parser = argparse.ArgumentParser(description="Rows per second for business payload validation")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    validator = validation.business_validator
+    for label, row in (("valid", VALID_ROW), ("invalid", INVALID_ROW)):
+        rows = [row] * args.rows
+        single = rows_per_second(lambda batch: [validator.validate(data) for data in batch], rows, args.repeat)
+        batch = rows_per_second(validator.validate_many, rows, args.repeat)
+        print(f"{label:<8} single: {single:>12,.0f} rows/s   batch: {batch:>12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
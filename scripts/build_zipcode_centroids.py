@@ -0,0 +1,58 @@
+import os
+import csv
+import argparse
+import numpy as np
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_script_dir)
+
+# Builds the zipcode centroid table used to geocode addresses offline. The input is the public-domain
+# Census Bureau ZCTA Gazetteer file (tab separated, with GEOID, INTPTLAT and INTPTLONG columns), e.g.
+#   https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2020_Gazetteer/2020_Gaz_zcta_national.zip
+# or any CSV with zipcode, latitude and longitude columns:
+#   python scripts/build_zipcode_centroids.py 2020_Gaz_zcta_national.txt
+# The committed data/zipcode_centroids.npz was built from the US entries of the MIT-licensed `zipcodes` package
+# (zipcodes 3.0.0), whose coordinates come from GeoNames (CC BY 4.0, https://www.geonames.org) and USPS.
+COLUMN_NAMES = {
+    'zipcode': ('GEOID', 'zipcode', 'zip'),
+    'latitude': ('INTPTLAT', 'latitude', 'lat'),
+    'longitude': ('INTPTLONG', 'longitude', 'lon', 'lng'),
+}
+
+def find_column(header, names):
+    stripped = {column.strip(): column for column in header}
+    for name in names:
+        if name in stripped:
+            return stripped[name]
+    raise SystemExit(f"Input has none of the columns {', '.join(names)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a zipcode centroid file into data/zipcode_centroids.npz")
+    parser.add_argument('source')
+    parser.add_argument('--output', default=os.path.join(project_root, 'data', 'zipcode_centroids.npz'))
+    args = parser.parse_args()
+
+    with open(args.source, newline='', encoding='utf-8-sig') as source:
+        delimiter = '\t' if '\t' in source.readline() else ','
+        source.seek(0)
+        reader = csv.DictReader(source, delimiter=delimiter)
+        columns = {key: find_column(reader.fieldnames, names) for key, names in COLUMN_NAMES.items()}
+
+        centroids = {}
+        for row in reader:
+            zipcode = row[columns['zipcode']].strip()
+            if len(zipcode) != 5 or not zipcode.isdigit():
+                continue
+            centroids[int(zipcode)] = (float(row[columns['latitude']]), float(row[columns['longitude']]))
+
+    zipcodes = np.array(sorted(centroids), dtype=np.uint32)
+    np.savez_compressed(
+        args.output,
+        zipcodes=zipcodes,
+        latitudes=np.array([centroids[zipcode][0] for zipcode in zipcodes], dtype=np.float32),
+        longitudes=np.array([centroids[zipcode][1] for zipcode in zipcodes], dtype=np.float32),
+    )
+    print(f"Wrote {len(zipcodes)} zipcode centroids to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Foursquare places search, for exercising the autocomplete proxy without the real
+# API. Point the app at it with
+#   FOURSQUARE_API_URL=http://localhost:8765/v3/places/search FOURSQUARE_API_KEY=stub
+# and run e.g.
+#   python scripts/foursquare_stub.py --latency 0.2 --failure-rate 0.1
+# The number of upstream calls served is printed on every request and available at /stats.
+class StubHandler(BaseHTTPRequestHandler):
+    calls = 0
+    lock = threading.Lock()
+    latency = 0.0
+    failure_rate = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self.respond(200, {"calls": StubHandler.calls})
+
+        with StubHandler.lock:
+            StubHandler.calls += 1
+            calls = StubHandler.calls
+
+        time.sleep(StubHandler.latency)
+        if random.random() < StubHandler.failure_rate:
+            return self.respond(503, {"message": "stub failure"})
+
+        params = parse_qs(url.query)
+        query = params.get('query', [''])[0]
+        limit = int(params.get('limit', ['5'])[0])
+        results = [{"fsq_id": f"stub-{index}", "name": f"{query.title()} Place {index}",
+                    "location": {"formatted_address": f"{index} Stub St"}} for index in range(limit)]
+        print(f"call {calls}: {query!r}")
+        self.respond(200, {"results": results})
+
+    def respond(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Foursquare places search server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of requests answered with a 503")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.failure_rate = args.failure_rate
+    server = ThreadingHTTPServer(('localhost', args.port), StubHandler)
+    print(f"Foursquare stub listening on http://localhost:{args.port}/v3/places/search")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import argparse
+import logging
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_script_dir)
+sys.path.insert(0, project_root)
+
+from app import app
+
+logging.basicConfig(level=logging.INFO)
+
+# Maintenance commands that run against the same database the app uses, e.g.
+#   python scripts/manage.py rebuild-business-details
+def rebuild_business_details(args):
+    from app.classes.business.business_details import BusinessDetails
+    from app.classes.business.invalidation_bus import invalidation_bus
+    total = BusinessDetails.rebuild(batch_size=args.batch_size)
+    invalidation_bus.publish_resync()
+    logging.info(f"business_details backfilled with {total} businesses")
+
+def ensure_indexes(args):
+    from app.classes.mongo.indexes import IndexRegistry
+    IndexRegistry.ensure_indexes()
+
+# Exits non-zero when any hot query would fall back to a collection scan.
+def explain_indexes(args):
+    from app.classes.mongo.indexes import IndexRegistry
+    report = IndexRegistry.explain_report()
+    for row in report:
+        flag = "COLLSCAN" if row['collscan'] else "ok"
+        print(f"{flag:<9} {row['collection']:<17} {row['query']:<45} {' <- '.join(row['stages'])}")
+    if any(row['collscan'] for row in report):
+        sys.exit(1)
+
+# Rebuilds business_rollups from the businesses collection and lists every counter that had drifted.
+# Exits non-zero when drift was found, whether or not it was repaired.
+def reconcile_rollups(args):
+    from app.classes.business.rollups import BusinessRollups
+    report = BusinessRollups.reconcile(apply=not args.dry_run)
+    for row in report['drift']:
+        print(f"{row['rollup']:<40} {row['field']:<28} expected {row['expected']:<16} actual {row['actual']}")
+    logging.info(f"{report['rollups']} rollups checked, {len(report['drift'])} drifted counters"
+                 f"{'' if args.dry_run or not report['drift'] else ', repaired'}")
+    if report['drift']:
+        sys.exit(1)
+
+# Geocodes addresses saved before zipcode centroids were attached, or every address with --all.
+def backfill_locations(args):
+    from app.classes.geo.zipcode_centroids import zipcode_centroids
+    if not zipcode_centroids.available:
+        logging.error("No zipcode centroid table found; build one with scripts/build_zipcode_centroids.py")
+        sys.exit(1)
+    updated = zipcode_centroids.relocate(only_missing=not args.all, batch_size=args.batch_size)
+    logging.info(f"Set the location of {updated} addresses")
+
+# Drops change log tombstones older than the retention period (CHANGE_LOG_RETENTION_DAYS by default).
+def compact_changes(args):
+    from datetime import timedelta
+    from app.classes.business.change_log import BusinessChangeLog
+    retention_days = args.retention_days if args.retention_days is not None else app.config['CHANGE_LOG_RETENTION_DAYS']
+    dropped = BusinessChangeLog.compact(timedelta(days=retention_days))
+    logging.info(f"Dropped {dropped} change log tombstones older than {retention_days} days")
+
+def main():
+    parser = argparse.ArgumentParser(description="BusinessDB maintenance commands")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild_parser = subparsers.add_parser('rebuild-business-details', help="Backfill the business_details read model")
+    rebuild_parser.add_argument('--batch-size', type=int, default=1000)
+    rebuild_parser.set_defaults(handler=rebuild_business_details)
+
+    subparsers.add_parser('ensure-indexes', help="Create every registered index").set_defaults(handler=ensure_indexes)
+    subparsers.add_parser('explain-indexes', help="Report the winning plan of every hot query shape").set_defaults(handler=explain_indexes)
+
+    reconcile_parser = subparsers.add_parser('reconcile-rollups', help="Rebuild business_rollups and report drift")
+    reconcile_parser.add_argument('--dry-run', action='store_true', help="Only report drift, don't rewrite the rollups")
+    reconcile_parser.set_defaults(handler=reconcile_rollups)
+
+    backfill_parser = subparsers.add_parser('backfill-locations', help="Attach zipcode centroid locations to addresses")
+    backfill_parser.add_argument('--all', action='store_true', help="Recompute every address, not just those without a location")
+    backfill_parser.add_argument('--batch-size', type=int, default=1000)
+    backfill_parser.set_defaults(handler=backfill_locations)
+
+    compact_parser = subparsers.add_parser('compact-changes', help="Drop old tombstones from the business change log")
+    compact_parser.add_argument('--retention-days', type=int)
+    compact_parser.set_defaults(handler=compact_changes)
+
+    args = parser.parse_args()
+    with app.app_context():
+        args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import json
+import importlib.util
+from bson import ObjectId
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_script_dir)
+data_dir = os.path.join(project_root, 'data')
+
+# Loads a module of the app that has no app dependencies by its path, e.g.
+# load_module('validation', 'app', 'classes', 'business', 'validation.py'). Importing it through the app
+# package would run the app's startup (database, Redis and IBM COS connections), which the benchmarks
+# and tests don't need.
+def load_module(name, *path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(project_root, *path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# With object_ids, the _id strings the backups store are turned back into the ObjectIds MongoDB returns
+def load_backup(name, object_ids=False):
+    with open(os.path.join(data_dir, f"{name}_backup.json"), encoding='utf-8') as backup:
+        documents = json.load(backup)
+    if object_ids:
+        for document in documents:
+            if ObjectId.is_valid(document.get('_id', '')):
+                document['_id'] = ObjectId(document['_id'])
+    return documents
+
+# Businesses from the backups with their addresses attached, as /api/business_info returns them
+def business_details(object_ids=False):
+    businesses = [business for business in load_backup('businesses', object_ids) if 'business_id' in business]
+    addresses = {address['address_id']: address
+                 for address in load_backup('addresses', object_ids) if 'address_id' in address}
+    links = load_backup('linker', object_ids)
+    return [dict(business, addresses=[addresses[link['address_id']] for link in links
+                                      if link['business_id'] == business['business_id']
+                                      and link['address_id'] in addresses])
+            for business in businesses]
+
+# An /api/businesses body; each copy after the first gets its own business IDs and names
+def business_listing(businesses, copies=1):
+    return [{"business_id": business['business_id'] + copy * len(businesses),
+             "business_name": f"{business['business_name']} #{copy}" if copy else business['business_name']}
+            for copy in range(copies) for business in businesses]
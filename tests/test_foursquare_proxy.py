@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import threading
+import importlib.util
+from http.server import ThreadingHTTPServer
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app import app
+from app.classes.business import foursquare_proxy as proxy_module
+from app.classes.business.foursquare_proxy import FoursquareProxy
+
+spec = importlib.util.spec_from_file_location('foursquare_stub', os.path.join(project_root, 'scripts', 'foursquare_stub.py'))
+foursquare_stub = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(foursquare_stub)
+StubHandler = foursquare_stub.StubHandler
+
+# Stands in for time in the proxy module only, so cache and breaker deadlines can be stepped over
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+# The part of the Redis client the proxy uses, with TTLs measured on the same clock
+class MemoryRedis:
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, 0))
+        return value if expires_at > self.clock.monotonic() else None
+
+    def setex(self, key, ttl, value):
+        self.values[key] = (value.encode('utf-8'), self.clock.monotonic() + ttl)
+
+@pytest.fixture
+def stub_url():
+    StubHandler.calls, StubHandler.latency, StubHandler.failure_rate = 0, 0.0, 0.0
+    server = ThreadingHTTPServer(('localhost', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}/v3/places/search"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(proxy_module, 'time', clock)
+    return clock
+
+@pytest.fixture
+def redis(monkeypatch, clock):
+    redis = MemoryRedis(clock)
+    monkeypatch.setattr(proxy_module, 'redis_client', redis)
+    return redis
+
+@pytest.fixture(autouse=True)
+def app_context():
+    with app.app_context():
+        yield
+
+def search_concurrently(proxy, queries):
+    results = [None] * len(queries)
+    barrier = threading.Barrier(len(queries))
+
+    def run(position):
+        barrier.wait()
+        results[position] = proxy.search(queries[position])
+
+    threads = [threading.Thread(target=run, args=(position,)) for position in range(len(queries))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_misses_share_one_upstream_call(stub_url, clock, redis):
+    StubHandler.latency = 0.3
+    proxy = FoursquareProxy(stub_url, 'stub')
+
+    results = search_concurrently(proxy, ['Coffee Shop', 'coffee  shop', ' COFFEE shop'] * 3)
+
+    assert StubHandler.calls == 1
+    assert all(result == results[0] and len(result) == 5 for result in results)
+    assert proxy.stats["misses"] == 1 and proxy.stats["coalesced"] == 8
+
+def test_cached_results_expire_after_the_ttl(stub_url, clock, redis):
+    proxy = FoursquareProxy(stub_url, 'stub', cache_ttl=60)
+
+    first = proxy.search('bakery')
+    assert proxy.search('bakery') == first
+    assert StubHandler.calls == 1 and proxy.stats["hits"] == 1
+
+    # Another worker finds the results in Redis
+    other_worker = FoursquareProxy(stub_url, 'stub', cache_ttl=60)
+    assert other_worker.search('bakery') == first
+    assert StubHandler.calls == 1 and other_worker.stats["redis_hits"] == 1
+
+    clock.advance(61)
+    assert proxy.search('bakery') == first
+    assert StubHandler.calls == 2 and proxy.stats["redis_hits"] == 0
+
+def test_lru_keeps_the_most_recently_used_queries(stub_url, clock, redis):
+    proxy = FoursquareProxy(stub_url, 'stub', cache_size=2)
+
+    for query in ('bakery', 'library', 'bakery', 'museum'):
+        proxy.search(query)
+
+    assert [key.rsplit(':', 1)[1] for key in proxy.cache] == ['bakery', 'museum']
+    proxy.search('library')
+    assert StubHandler.calls == 3 and proxy.stats["redis_hits"] == 1
+
+def test_breaker_opens_probes_when_half_open_and_closes_on_success(stub_url, clock, redis):
+    StubHandler.failure_rate = 1.0
+    proxy = FoursquareProxy(stub_url, 'stub', failure_threshold=3, reset_after=30)
+
+    for query in ('one', 'two', 'three'):
+        assert proxy.search(query) == []
+    assert StubHandler.calls == 3
+
+    # Open: nothing reaches the upstream
+    assert proxy.search('four') == []
+    assert StubHandler.calls == 3 and proxy.stats["short_circuited"] == 1
+
+    # Half-open: one probe goes through, and failing it opens the breaker again
+    clock.advance(31)
+    assert proxy.search('five') == []
+    assert StubHandler.calls == 4
+    assert proxy.search('six') == []
+    assert StubHandler.calls == 4
+
+    # Half-open again: while the probe is out, every other call is short-circuited
+    clock.advance(31)
+    StubHandler.failure_rate, StubHandler.latency = 0.0, 0.3
+    probe = threading.Thread(target=proxy.search, args=('seven',))
+    probe.start()
+    while StubHandler.calls < 5:
+        time.sleep(0.01)
+    assert proxy.search('eight') == []
+    probe.join()
+    assert StubHandler.calls == 5
+
+    # Closed: the successful probe resets the breaker
+    StubHandler.latency = 0.0
+    assert proxy.failures == 0 and proxy.open_until == 0
+    assert len(proxy.search('nine')) == 5
+    assert StubHandler.calls == 6
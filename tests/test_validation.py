@@ -0,0 +1,40 @@
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, 'scripts'))
+
+from standalone import load_module
+
+validation = load_module('validation', 'app', 'classes', 'business', 'validation.py')
+
+ADDRESS = {"line1": "12 River Rd", "line2": "Suite 4", "city": "Springfield", "state": "IL",
+           "zipcode": "62701", "country": "US"}
+
+def test_partial_address_allows_clearing_optional_fields():
+    assert validation.address_partial_validator.validate({"line2": ""}) == []
+    assert validation.address_partial_validator.validate({"line2": "   "}) == []
+    assert validation.address_partial_validator.validate({"line2": None}) == []
+    assert validation.address_partial_validator.validate({"city": "Chicago", "line2": None}) == []
+
+def test_partial_address_rejects_clearing_required_fields():
+    assert validation.address_partial_validator.validate({"city": ""}) == ["Missing or empty required field: city"]
+    assert validation.address_partial_validator.validate({"city": None}) == [
+        "Invalid data type for field: city. Expected string."]
+
+def test_partial_address_checks_fields_that_are_present():
+    assert validation.address_partial_validator.validate({}) == []
+    assert validation.address_partial_validator.validate({"zipcode": "627"}) == ["Invalid zipcode format."]
+    assert validation.address_partial_validator.validate({"line2": 4}) == [
+        "Invalid data type for field: line2. Expected string."]
+
+def test_full_address_requires_fields_but_not_line2():
+    assert validation.address_validator.validate(dict(ADDRESS, line2="")) == []
+    assert validation.address_validator.validate(dict(ADDRESS, city=" ")) == ["Missing or empty address field: city"]
+    assert validation.address_validator.validate({key: value for key, value in ADDRESS.items() if key != 'state'}) == [
+        "Missing or empty address field: state"]
+
+def test_partial_business_update_allows_blank_nested_line2():
+    assert validation.business_update_validator.validate({"address": {"line2": ""}}) == []
+    assert validation.business_update_validator.validate({"business_name": ""}) == [
+        "Missing or empty required field: business_name"]